@@ -0,0 +1,59 @@
+'''
+Benchmark for checkpointed reverse mode through a long time-stepping loop
+
+Differentiates n explicit Euler steps of a pendulum once with the whole graph
+recorded (ReverseAutoDiff.vjp on the unrolled loop) and once with
+CheckpointedLoop for several snapshot budgets, reporting the peak memory
+traced by tracemalloc, the wall time and the forward recomputation factor.
+
+Run from the repository root:  python benchmarks/bench_checkpoint.py [n_steps]
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.ad import ReverseAutoDiff
+from src.checkpoint import CheckpointedLoop
+from src.elementary_functions import sin
+
+H = 0.001
+
+
+def step(x):
+    return [x[0] + H * x[1], x[1] - H * sin(x[0])]
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak / 2 ** 20, result
+
+
+if __name__ == '__main__':
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    x0, u = [0.5, 0.1], [1.0, 0.0]
+
+    def unrolled(x):
+        for _ in range(n_steps):
+            x = step(x)
+        return x
+
+    seconds, peak, (_, expected) = measure(lambda: ReverseAutoDiff(unrolled).vjp(x0, u))
+    print('%d steps' % n_steps)
+    print('%-22s %10s %12s %14s' % ('', 'time (s)', 'peak (MB)', 'recomputation'))
+    print('%-22s %10.2f %12.2f %14s' % ('full graph', seconds, peak, '1.00'))
+    for snapshots in (50, 10, 3):
+        loop = CheckpointedLoop(step, n_steps, snapshots=snapshots)
+        seconds, peak, (_, gradient) = measure(lambda: loop.vjp(x0, u))
+        assert np.allclose(gradient, expected)
+        print('%-22s %10.2f %12.2f %14.2f' % ('snapshots=%d (t=%d)' % (snapshots, loop.repetitions), seconds, peak,
+                                             loop.advances / n_steps))
@@ -0,0 +1,54 @@
+'''
+Benchmark for graph lifetime across repeated reverse mode calls
+
+Calls ReverseAutoDiff.reverse_mode 10^4 times on the same instance and prints
+the resident set size (from /proc/self/statm, Linux only) every 1000 calls, for
+the default retain_graph=False and for retain_graph=True, which keeps the last
+graph referenced from the instance. RSS should stay flat in every column.
+
+Run from the repository root:  python benchmarks/bench_graph_memory.py [calls]
+'''
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.ad import ReverseAutoDiff
+from src.elementary_functions import sin, exp
+
+
+def f(x):
+    # about 600 nodes, two outputs sharing most of the graph
+    y = x[0]
+    for i in range(200):
+        y = sin(y * x[i % 3]) + x[(i + 1) % 3]
+    return [y, exp(y * 0.01) * x[2]]
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def run(mode, retain_graph, calls, every):
+    rad = ReverseAutoDiff(f, mode=mode)
+    vals = [0.3, 0.7, 1.1]
+    samples = []
+    for call in range(1, calls + 1):
+        rad.reverse_mode(vals, retain_graph=retain_graph)
+        if call % every == 0:
+            samples.append(rss_mb())
+    return samples
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 4
+    every = max(calls // 10, 1)
+    configs = [('graph', False), ('graph', True), ('tape', False)]
+    columns = {config: run(*config, calls, every) for config in configs}
+    print('%8s' % 'calls' + ''.join('%22s' % ('%s retain=%s' % config) for config in configs))
+    for k in range(len(columns[configs[0]])):
+        print('%8d' % ((k + 1) * every) + ''.join('%19.1f MB' % columns[config][k] for config in configs))
+    for config in configs:
+        growth = columns[config][-1] - columns[config][0]
+        print('%s retain_graph=%s: RSS growth after the first sample %.2f MB' % (config[0], config[1], growth))
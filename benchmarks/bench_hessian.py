@@ -0,0 +1,55 @@
+'''
+Benchmark for forward-mode Hessians with hyper-dual numbers
+
+For n = 5 .. 40 inputs, times AutoDiff.get_hessian (one pass, the n(n+1)/2 upper-triangle
+seed pairs batched in the hyper-dual parts) against one scalar hyper-dual pass per entry
+(n^2 passes) and against ReverseAutoDiff.hessian (forward-over-reverse).
+
+Run from the repository root:  python benchmarks/bench_hessian.py
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from src.ad import AutoDiff, ReverseAutoDiff
+from src.dual import HyperDualNumber
+from src.elementary_functions import sin, exp
+
+
+def energy(x):
+    n = len(x)
+    total = 0
+    for i in range(n):
+        total = total + sin(x[i]) * x[(i + 1) % n] + exp(0.1 * x[i] * x[(i + 2) % n])
+    return [total]
+
+
+def scalar_passes(x):
+    n = len(x)
+    hessian = np.zeros((n, n))
+    for i in range(n):
+        for j in range(n):
+            tracer = [HyperDualNumber(val, float(k == i), float(k == j), 0.0) for k, val in enumerate(x)]
+            hessian[i, j] = energy(tracer)[0].eps12
+    return hessian
+
+
+def timed(run, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = run()
+    return (time.perf_counter() - start) / repeats * 1e3, result
+
+
+if __name__ == '__main__':
+    print('{:>4} {:>18} {:>18} {:>18}'.format('n', 'batched (ms)', 'n^2 passes (ms)', 'reverse (ms)'))
+    for n in (5, 10, 20, 40):
+        x = list(np.linspace(0.1, 1.0, n))
+        t_batched, hessian = timed(lambda: AutoDiff(energy).get_hessian(x)[0])
+        t_scalar, expected = timed(lambda: scalar_passes(x), repeats=1)
+        t_reverse, reverse = timed(lambda: ReverseAutoDiff(energy).hessian(x))
+        assert np.allclose(hessian, expected) and np.allclose(hessian, reverse)
+        print('{:>4} {:>18.2f} {:>18.2f} {:>18.2f}'.format(n, t_batched, t_scalar, t_reverse))
@@ -0,0 +1,58 @@
+'''
+Benchmark for incremental re-evaluation after a few input entries change
+
+A 1000-input loss (a pairwise-summed energy of neighbouring entries) is differentiated
+at a new point that differs from the previous one in k entries. Prints the rows the
+update recomputed forwards and backwards, and the time of get_jacobian with
+incremental=True against a full tape-mode evaluation.
+
+Run from the repository root:  python benchmarks/bench_incremental.py
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from src.ad import ReverseAutoDiff
+from src.elementary_functions import sin
+
+N = 1000
+
+
+def energy(x):
+    terms = [sin(x[i]) * x[(i + 1) % N] + (x[i] - 0.5) ** 2 for i in range(N)]
+    # pairwise summation keeps every input within log2(N) additions of the output
+    while len(terms) > 1:
+        terms = [terms[i] + terms[i + 1] if i + 1 < len(terms) else terms[i] for i in range(0, len(terms), 2)]
+    return terms
+
+
+def timed(run, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = run()
+    return (time.perf_counter() - start) / repeats, result
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    incremental, full = ReverseAutoDiff(energy, incremental=True), ReverseAutoDiff(energy, mode='tape')
+    x = rng.uniform(size=N)
+    incremental.get_jacobian(list(x))
+    rows = incremental.incremental.touched
+    print('{} rows; k changed entries per call'.format(rows))
+    print('{:>6} {:>9} {:>9} {:>16} {:>12} {:>9}'.format('k', 'touched', 'swept', 'incremental (ms)', 'full (ms)', 'speedup'))
+    for k in (1, 10, 100, 1000):
+        points = []
+        for _ in range(20):
+            x = x.copy()
+            x[rng.choice(N, k, replace=False)] += 0.01
+            points.append(list(x))
+        calls = iter(points)
+        t_inc, jacob = timed(lambda: incremental.get_jacobian(next(calls)))
+        touched, swept = incremental.incremental.touched, incremental.incremental.swept
+        t_full, expected = timed(lambda: full.get_jacobian(points[-1]))
+        assert np.allclose(jacob, expected)
+        print('{:>6} {:>9} {:>9} {:>16.2f} {:>12.2f} {:>8.1f}x'.format(k, touched, swept, t_inc * 1e3, t_full * 1e3, t_full / t_inc))
@@ -0,0 +1,92 @@
+'''
+Memory benchmark for the slotted DualNumber and ReverseNode layouts
+
+Records a representative 10^6-op function (products, sums and sin over four
+inputs) and reports the bytes traced by tracemalloc per recorded op while the
+graph is alive. "before" rebuilds the same graph with a replica of the original
+ReverseNode layout (per-instance __dict__ plus child_pointers/gradient lists);
+"after" uses the current slotted ReverseNode. The same comparison is made for
+forward-mode DualNumbers.
+
+Run from the repository root:  python benchmarks/bench_node_memory.py [n_ops]
+'''
+import gc
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.dual import DualNumber
+from src.reversead import ReverseNode
+
+
+class DictReverseNode():
+    # original layout: __dict__ with a list of children and a list of gradients per node
+    def __init__(self, val, gradient=None):
+        self.val = val
+        self.child_pointers = []
+        self.gradient = gradient
+
+    def __add__(self, arg):
+        a = DictReverseNode(self.val + arg.val, [1, 1])
+        a.child_pointers = [self, arg]
+        return a
+
+    def __mul__(self, arg):
+        a = DictReverseNode(self.val * arg.val, [arg.val, self.val])
+        a.child_pointers = [self, arg]
+        return a
+
+    def sin(self):
+        a = DictReverseNode(np.sin(self.val), [np.cos(self.val)])
+        a.child_pointers = [self]
+        return a
+
+
+class DictDualNumber():
+    # original layout: real and dual parts in a per-instance __dict__
+    def __init__(self, real, dual=1):
+        self.real = real
+        self.dual = dual
+
+
+def reverse_sin(node):
+    if isinstance(node, DictReverseNode):
+        return node.sin()
+    return ReverseNode.unary(np.sin(node.val), node, np.cos(node.val))
+
+
+def record(node_type, n_ops):
+    # keep every intermediate reachable, as a recorded graph does
+    x = [node_type(v) for v in (0.5, 0.25, 0.75, 0.1)]
+    y = x[0]
+    for i in range(n_ops // 3):
+        y = reverse_sin(y * x[i % 4]) + x[(i + 1) % 4]
+    return y
+
+
+def traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current
+
+
+if __name__ == '__main__':
+    n_ops = int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 6
+    sys.setrecursionlimit(10 ** 4)
+    rows = [
+        ('ReverseNode', 'before', traced_bytes(lambda: record(DictReverseNode, n_ops))),
+        ('ReverseNode', 'after', traced_bytes(lambda: record(ReverseNode, n_ops))),
+        ('DualNumber', 'before', traced_bytes(lambda: [DictDualNumber(float(i), 1.0) for i in range(n_ops)])),
+        ('DualNumber', 'after', traced_bytes(lambda: [DualNumber(float(i), 1.0) for i in range(n_ops)])),
+    ]
+    print('{:<14}{:>8}{:>14}{:>14}'.format('type', 'layout', 'MB', 'bytes / op'))
+    for name, layout, nbytes in rows:
+        print('{:<14}{:>8}{:>14.1f}{:>14.1f}'.format(name, layout, nbytes / 2 ** 20, nbytes / n_ops))
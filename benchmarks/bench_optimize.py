@@ -0,0 +1,51 @@
+'''
+Benchmark for the tape optimizer used by compiled functions
+
+Compiles a model with the redundancy traced code typically has (the same sin(x[i])
+recomputed in every term, unit and zero coefficients, an unused diagnostic) with and
+without optimize, and prints the row counts and the time of a compiled reverse call.
+
+Run from the repository root:  python benchmarks/bench_optimize.py
+'''
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from src.compiler import CompiledFunction
+from src.elementary_functions import sin, exp
+
+N = 30
+WEIGHTS = np.where(np.arange(N) % 3 == 0, 1.0, np.where(np.arange(N) % 3 == 1, 0.0, 0.5)).tolist()
+
+
+def model(x):
+    outputs = []
+    for k in range(4):
+        total = 0
+        for i in range(N):
+            total = total + WEIGHTS[i] * sin(x[i]) * sin(x[(i + 1) % N]) + x[i] * 1
+        diagnostic = exp(total) ** 2
+        outputs.append(total * (k + 1))
+    return outputs + [1]
+
+
+def time_calls(compiled, x, calls=2000):
+    compiled(x)
+    start = time.perf_counter()
+    for _ in range(calls):
+        compiled(x)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+if __name__ == '__main__':
+    x = np.linspace(0.1, 1.0, N)
+    optimized = CompiledFunction(model)
+    plain = CompiledFunction(model, optimize=False)
+    us_optimized, us_plain = time_calls(optimized, x), time_calls(plain, x)
+    assert np.allclose(optimized(x)[1], plain(x)[1])
+    report = optimized.reports[N][0]
+    print('rows before: {before}  merged: {merged}  folded: {folded}  pruned: {pruned}  after: {after}'.format(**report))
+    print('compiled reverse call: {:.1f} us unoptimized, {:.1f} us optimized ({:.2f}x)'.format(us_plain, us_optimized, us_plain / us_optimized))
@@ -0,0 +1,52 @@
+'''
+Benchmark for cold start from a saved trace file
+
+Times the first reverse Jacobian of an 80,000-row model in a fresh CompiledFunction:
+tracing and lowering it, against loading the file written by CompiledFunction.save
+(np.memmap views, replayed by the interpreter or lowered). The time of a warm call is
+printed for both kinds of program.
+
+Run from the repository root:  python benchmarks/bench_serialize.py
+'''
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from src.compiler import CompiledFunction
+from src.elementary_functions import sin
+
+
+def model(x):
+    y = x[0]
+    for i in range(20000):
+        y = sin(y * x[i % 4]) + x[(i + 1) % 4]
+    return [y, x[1] * 2]
+
+
+def timed(run):
+    start = time.perf_counter()
+    result = run()
+    return time.perf_counter() - start, result
+
+
+if __name__ == '__main__':
+    x = [0.1, 0.2, 0.3, 0.4]
+    path = os.path.join(tempfile.mkdtemp(), 'model.trace')
+    save_time, _ = timed(lambda: CompiledFunction(model).save(path, x))
+    print('saved {:.1f} MB in {:.2f} s'.format(os.path.getsize(path) / 2 ** 20, save_time))
+
+    rows = []
+    for label, make in (('trace + lower', lambda: CompiledFunction(model)),
+                        ('load, interpreted', lambda: CompiledFunction(model).load(path)),
+                        ('load + lower', lambda: CompiledFunction(model).load(path, interpreted=False))):
+        cold, (compiled, result) = timed(lambda: (lambda c: (c, c(x)))(make()))
+        warm, _ = timed(lambda: compiled(x))
+        rows.append((label, cold, warm, result[1]))
+    assert all(np.allclose(row[3], rows[0][3]) for row in rows)
+    print('{:>20} {:>12} {:>12}'.format('', 'first (s)', 'warm (s)'))
+    for label, cold, warm, _ in rows:
+        print('{:>20} {:12.2f} {:12.3f}'.format(label, cold, warm))
@@ -0,0 +1,67 @@
+'''
+Benchmark for streaming gradient accumulation
+
+Differentiates a least-squares loss over 10^3 .. 10^5 records (scalar ReverseNode graph,
+five nodes per record) in chunks of 1000 records, and prints the time and tracemalloc peak
+of streaming_gradient next to a single reverse sweep over the whole dataset (up to 10^4
+records). The streaming peak should stay flat as the dataset grows. Chunks are produced by
+a generator that sleeps to mimic I/O; prefetch=1 overlaps that delay with the sweeps.
+
+Run from the repository root:  python benchmarks/bench_streaming.py
+'''
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np
+from src.ad import ReverseAutoDiff
+from src.streaming import streaming_gradient
+
+CHUNK = 1000
+LOAD_DELAY = 0.02
+
+
+def loss(p, chunk):
+    X, Y = chunk
+    total = 0
+    for x, y in zip(X.tolist(), Y.tolist()):
+        total = total + (p[0] * x[0] + p[1] * x[1] - y) ** 2
+    return total
+
+
+def chunks(n_records):
+    rng = np.random.default_rng(0)
+    for start in range(0, n_records, CHUNK):
+        time.sleep(LOAD_DELAY)
+        X = rng.normal(size=(min(CHUNK, n_records - start), 2))
+        yield X, X @ np.array([1.5, -0.5])
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def full_sweep(n_records):
+    X = np.concatenate([X for X, _ in chunks(n_records)])
+    Y = X @ np.array([1.5, -0.5])
+    ReverseAutoDiff(lambda p: [loss(p, (X, Y))]).get_jacobian([0.1, 0.2])
+
+
+if __name__ == '__main__':
+    params = [0.1, 0.2]
+    print('{:>9} {:>22} {:>22} {:>22}'.format('records', 'full graph (s, MB)', 'streaming (s, MB)', 'prefetch=1 (s, MB)'))
+    for n_records in (10 ** 3, 10 ** 4, 10 ** 5):
+        full = measure(lambda: full_sweep(n_records)) if n_records <= 10 ** 4 else None
+        streamed = measure(lambda: streaming_gradient(loss, params, chunks(n_records)))
+        prefetched = measure(lambda: streaming_gradient(loss, params, chunks(n_records), prefetch=1))
+        cells = ['{:10.2f} {:10.2f}'.format(*result) if result else '{:>21}'.format('-') for result in (full, streamed, prefetched)]
+        print('{:>9} {:>22} {:>22} {:>22}'.format(n_records, *cells))
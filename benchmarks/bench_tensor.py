@@ -0,0 +1,51 @@
+'''
+Benchmark for array-valued TensorNodes against scalarized ReverseNodes
+
+Differentiates sum(tanh(W @ x)) for a dense n x n W with ReverseAutoDiff in
+'graph' mode (one ReverseNode per multiply-add, about n^2 nodes) and in
+'tensor' mode (a handful of array nodes) and reports the gradient time.
+
+Run from the repository root:  python benchmarks/bench_tensor.py [n ...]
+'''
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.ad import ReverseAutoDiff
+from src.elementary_functions import tanh
+
+
+def layers(W):
+    def scalar(x):
+        total = 0
+        for row in W:
+            acc = 0
+            for w, xj in zip(row, x):
+                acc = acc + w * xj
+            total = total + tanh(acc)
+        return [total]
+
+    def array(x):
+        return [np.tanh(W @ x).sum()]
+    return scalar, array
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 300, 1000]
+    rng = np.random.default_rng(0)
+    print('%6s %14s %14s %10s' % ('n', 'graph (s)', 'tensor (s)', 'speedup'))
+    for n in sizes:
+        W, x = rng.normal(size=(n, n)) / n, list(rng.normal(size=n))
+        scalar, array = layers(W)
+        start = time.perf_counter()
+        g_tensor = ReverseAutoDiff(array, mode='tensor').get_jacobian(x)
+        tensor_time = time.perf_counter() - start
+        start = time.perf_counter()
+        g_graph = ReverseAutoDiff(scalar).get_jacobian(x)
+        graph_time = time.perf_counter() - start
+        assert np.allclose(g_graph, g_tensor)
+        print('%6d %14.4f %14.4f %9.0fx' % (n, graph_time, tensor_time, graph_time / tensor_time))
@@ -1,12 +1,96 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-from dual import DualNumber 
-from elementary_functions import *
-from reversead import *
+try:
+    from .dual import DualNumber, TaylorNumber, HyperDualNumber
+    from .elementary_functions import *
+    from .reversead import *
+    from .compiler import CompiledFunction, trace
+    from .sparsity import jacobian_sparsity, color_columns, decompress
+    from .parallel import attach_shared, run_shared_rows
+    from .cache import ResultCache
+    from .incremental import IncrementalTape
+    from .graph import topological_order
+    from . import tape
+    from . import tensor
+except ImportError:
+    from dual import DualNumber, TaylorNumber, HyperDualNumber
+    from elementary_functions import *
+    from reversead import *
+    from compiler import CompiledFunction, trace
+    from sparsity import jacobian_sparsity, color_columns, decompress
+    from parallel import attach_shared, run_shared_rows
+    from cache import ResultCache
+    from incremental import IncrementalTape
+    from graph import topological_order
+    import tape
+    import tensor
+
+
+def _jacobian_columns(function, vec, start, stop):
+    # Worker for AutoDiff.get_jacobian(executor=...); module level so process pools can pickle it
+    return AutoDiff(function)._jacobian_block(vec, start, stop)[1]
+
+
+def _batch_rows(function, X, chunk_size):
+    # Worker for AutoDiff.forward_mode_batch(executor=...)
+    return AutoDiff(function).forward_mode_batch(X, chunk_size=chunk_size)
+
+
+def _reverse_rows(function, mode, X):
+    # Worker for ReverseAutoDiff.reverse_mode_batch(executor=...)
+    return ReverseAutoDiff(function, mode=mode).reverse_mode_batch(X)
+
+
+def _write_shared_rows(batch, x_spec, vals_spec, jacob_spec, start, stop):
+    # Map the shared input and outputs, differentiate rows [start, stop) and write them in place
+    blocks, arrays = [], []
+    try:
+        for spec in (x_spec, vals_spec, jacob_spec):
+            block, array = attach_shared(spec)
+            blocks.append(block)
+            arrays.append(array)
+        X, vals, jacob = arrays
+        vals[start:stop], jacob[start:stop] = batch(X[start:stop])
+    finally:
+        # the views must be gone before the mappings can be closed
+        X = vals = jacob = arrays = None
+        for block in blocks:
+            block.close()
+
+
+def _batch_rows_shared(x_spec, vals_spec, jacob_spec, start, stop, function, chunk_size):
+    # Shared-memory worker for AutoDiff.forward_mode_batch
+    _write_shared_rows(lambda X: AutoDiff(function).forward_mode_batch(X, chunk_size=chunk_size), x_spec, vals_spec, jacob_spec, start, stop)
+
+
+def _reverse_rows_shared(x_spec, vals_spec, jacob_spec, start, stop, function, mode):
+    # Shared-memory worker for ReverseAutoDiff.reverse_mode_batch
+    _write_shared_rows(ReverseAutoDiff(function, mode=mode).reverse_mode_batch, x_spec, vals_spec, jacob_spec, start, stop)
 
 
 class AutoDiff():
-    def __init__(self, function):
+    def __init__(self, function, cache_size=None, cache_eviction='lru', incremental=False):
+        # cache_size enables a bounded cache of values and Jacobians keyed on the input bytes
+        # incremental keeps the traced function between calls and only recomputes what changed inputs reach
+        self.cache = None if cache_size is None else ResultCache(cache_size, cache_eviction)
+        self.incremental = IncrementalTape(function) if incremental else None
         self.function = function
+        self.compiled = None
+
+    @property
+    def function(self):
+        return self._function
+
+    @function.setter
+    def function(self, function):
+        # Results cached for the old function are stale once it is replaced
+        self._function = function
+        if self.cache is not None:
+            self.cache.clear()
+        if self.incremental is not None and self.incremental.func is not function:
+            self.incremental = IncrementalTape(function)
 
     def get_val(self, vec=None):
 
@@ -15,123 +99,589 @@ class AutoDiff():
             raise ValueError('No val has been passed into AutoDiff instance.')
 
         # If the user is passing in a new val
-        else: 
-            try:
-                # Make tracer vector with all values as DualNumbers and evaluate the given function
-                tracer = [DualNumber(val, 1) for val in vec] 
-                evaluation = self.function(tracer) 
-            except:
-                raise ValueError('Entries in input vector must be either int or float.')
-
-            return np.array([value.real for value in evaluation])
+        elif self.cache is not None:
+            return self.cache.lookup('values', vec, lambda: self._evaluate(vec))
+        else:
+            return self._evaluate(vec)
+
+    def _evaluate(self, vec):
+        if self.incremental is not None:
+            return self.incremental.evaluate(vec)[0]
+        try:
+            # Make tracer vector with all values as DualNumbers and evaluate the given function
+            tracer = [DualNumber(val, 1) for val in vec] 
+            evaluation = self.function(tracer) 
+        except:
+            raise ValueError('Entries in input vector must be either int or float.')
+
+        return np.array([value.real for value in evaluation])
             
-    def get_jacobian(self, vec=None):
+    def _seed(self, vec, start, stop, batch_shape=(), directions=None):
+        # Seed every input with a (stop - start)-wide dual vector; inputs in [start, stop) get a unit direction
+        # Batched inputs carry one dual vector per batch entry, laid out as (directions, *batch_shape)
+        # directions[i], when given, replaces i as the seed direction of input i (several inputs may share one)
+        tracer = []
+        for i, val in enumerate(vec):
+            seed = np.zeros((stop - start,) + batch_shape)
+            direction = i if directions is None else directions[i]
+            if start <= direction < stop:
+                seed[direction - start] = 1
+            tracer.append(DualNumber(val, seed))
+        return tracer
+
+    def _jacobian_block(self, vec, start, stop, batch_shape=(), directions=None):
+        # One pass seeding directions [start, stop); returns the outputs and their (m, stop - start, *batch_shape) duals
+        try:
+            curr = self.function(self._seed(vec, start, stop, batch_shape, directions))
+        except IndexError:
+            raise IndexError('Number of inputs do not match number of variables.')
+
+        block = []
+        for _, val in enumerate(curr):
+            if not type(val) == DualNumber:
+                block.append(np.zeros((stop - start,) + batch_shape))
+            else:
+                block.append(np.broadcast_to(val.dual, (stop - start,) + batch_shape))
+        return curr, np.array(block, dtype=float).reshape((len(block), stop - start) + batch_shape)
+
+    def _jacobian_blocks(self, vec, chunk_size, batch_shape=(), directions=None):
+        # Evaluate the function once per chunk of seed directions; a single pass when chunk_size is None
+        n = len(vec) if directions is None else int(max(directions, default=-1)) + 1
+        chunk_size = n if chunk_size is None else chunk_size
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer.')
+
+        for start in range(0, n, chunk_size):
+            yield self._jacobian_block(vec, start, min(start + chunk_size, n), batch_shape, directions)
+
+    @staticmethod
+    def _executor_blocks(n, chunk_size):
+        # Default to one large block per CPU so each worker amortizes the pickling of the function and inputs
+        if chunk_size is None:
+            chunk_size = -(-n // (os.cpu_count() or 1))
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be a positive integer.')
+        starts = list(range(0, n, chunk_size))
+        return starts, [min(start + chunk_size, n) for start in starts]
+
+    def get_jacobian(self, vec=None, chunk_size=None, executor=None):
 
         # If the user hasn't pass in a list of values
         if not vec: 
             raise ValueError('No val has been passed into AutoDiff instance.')
+        elif self.cache is not None:
+            return self.cache.lookup('jacobians', vec, lambda: self._get_jacobian(vec, chunk_size, executor))
         else:
-            # Declare empty matrix for Jacobian
-            jacob = []
-            for i, val in enumerate(vec):
-                lst = []
-                for j in range(0, i):
-                    lst.append(DualNumber(vec[j], 0))
-
-                lst.append(DualNumber(val, 1))
+            return self._get_jacobian(vec, chunk_size, executor)
+
+    def _get_jacobian(self, vec, chunk_size, executor):
+        if self.incremental is not None:
+            return self.incremental.evaluate(vec)[1]
+        elif executor is not None:
+            # Fan blocks of columns out over a concurrent.futures executor; map keeps them in order
+            starts, stops = self._executor_blocks(len(vec), chunk_size)
+            n_blocks = len(starts)
+            return np.hstack(list(executor.map(_jacobian_columns, [self.function] * n_blocks, [list(vec)] * n_blocks, starts, stops)))
+        else:
+            # Stack the (m, chunk) column blocks into the (m, n) Jacobian
+            return np.hstack([block for _, block in self._jacobian_blocks(vec, chunk_size)])
 
-                for j in range(i + 1, len(vec)):
-                    lst.append(DualNumber(vec[j], 0))
-                try:
-                    curr = self.function(lst)
-                except:
-                    raise IndexError('Number of inputs do not match number of variables.')
-                
-                updated = []
-                for _, val in enumerate(curr):
-                    if not type(val) == DualNumber:
-                        updated.append(0)
-                    else:
-                        updated.append(val.dual)
-                jacob.append(updated)
+    def get_sparse_jacobian(self, vec=None, sparsity=None, chunk_size=None):
 
-            return np.array(jacob).T
+        # If the user hasn't pass in a list of values
+        if not vec:
+            raise ValueError('No val has been passed into AutoDiff instance.')
 
-    def forward_mode(self, val=None):
-        return self.get_val(val), self.get_jacobian(val)
+        # Structurally orthogonal columns share a color and therefore one seed direction,
+        # so the forward pass is only as wide as the number of colors
+        if sparsity is None:
+            sparsity = jacobian_sparsity(self.function, vec)
+        colors, n_colors = color_columns(sparsity)
+        if n_colors == 0:
+            return decompress(np.zeros((sparsity.shape[0], 0)), sparsity, colors)
+        compressed = np.hstack([block for _, block in self._jacobian_blocks(vec, chunk_size, directions=colors)])
+        return decompress(compressed, sparsity, colors)
+
+    def forward_mode(self, val=None, chunk_size=None, executor=None):
+        return self.get_val(val), self.get_jacobian(val, chunk_size=chunk_size, executor=executor)
+
+    def jvp(self, vec=None, v=None):
+        # Jacobian-vector product J v from a single pass with the dual parts seeded by v
+        if not vec:
+            raise ValueError('No val has been passed into AutoDiff instance.')
+        if v is None or len(v) != len(vec):
+            raise ValueError('Direction v must have one entry per input.')
+        try:
+            curr = self.function([DualNumber(val, direction) for val, direction in zip(vec, v)])
+        except IndexError:
+            raise IndexError('Number of inputs do not match number of variables.')
+
+        vals = np.array([val.real if type(val) == DualNumber else val for val in curr], dtype=float)
+        jv = np.array([val.dual if type(val) == DualNumber else 0 for val in curr], dtype=float)
+        return vals, jv
+
+    def taylor(self, vec=None, direction=None, order=1):
+        # Derivatives d^k/dt^k f(vec + t * direction) at t = 0 for k = 0..order, from one Taylor-mode pass
+        # Returns an (m, order + 1) array; column 0 holds the function values
+        if not vec:
+            raise ValueError('No val has been passed into AutoDiff instance.')
+        if direction is None or len(direction) != len(vec):
+            raise ValueError('Direction must have one entry per input.')
+        tracer = []
+        for val, d in zip(vec, direction):
+            coeffs = np.zeros(order + 1)
+            coeffs[0] = val
+            if order:
+                coeffs[1] = d
+            tracer.append(TaylorNumber(coeffs))
+        try:
+            curr = self.function(tracer)
+        except IndexError:
+            raise IndexError('Number of inputs do not match number of variables.')
+
+        coeffs = np.zeros((len(curr), order + 1))
+        for i, val in enumerate(curr):
+            if type(val) == TaylorNumber:
+                coeffs[i] = val.coeffs
+            else:
+                coeffs[i, 0] = val
+        factorials = np.cumprod(np.concatenate(([1.0], np.arange(1, order + 1))))
+        return coeffs * factorials
+
+    def get_hessian(self, vec=None):
+        # Exact Hessians of every output, (m, n, n), from one hyper-dual pass
+        # Slot p of the eps1/eps2 parts seeds the upper-triangle pair (i_p, j_p), so eps12 carries all n(n+1)/2 entries at once
+        if not vec:
+            raise ValueError('No val has been passed into AutoDiff instance.')
+        n = len(vec)
+        rows, cols = np.triu_indices(n)
+        tracer = [HyperDualNumber(val, (rows == k).astype(float), (cols == k).astype(float), np.zeros(len(rows)))
+                  for k, val in enumerate(vec)]
+        try:
+            curr = self.function(tracer)
+        except IndexError:
+            raise IndexError('Number of inputs do not match number of variables.')
+
+        hessian = np.zeros((len(curr), n, n))
+        for i, val in enumerate(curr):
+            if type(val) == HyperDualNumber:
+                upper = np.broadcast_to(val.eps12, rows.shape)
+                hessian[i, rows, cols] = upper
+                hessian[i, cols, rows] = upper
+        return hessian
+
+    def forward_mode_batch(self, X, chunk_size=None, executor=None, row_chunk_size=None, shared_memory=None):
+        # Evaluate at every row of an (N, n) matrix with one vectorized pass (per chunk of columns)
+        # With an executor, blocks of rows (row_chunk_size, default one block per CPU) run in parallel
+        # shared_memory (default: on for process pools) passes X and the outputs through shared memory, not pickles
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[0] == 0:
+            raise ValueError('Input must be a non-empty (N, n) array of points.')
+        if executor is not None:
+            starts, stops = self._executor_blocks(X.shape[0], row_chunk_size)
+            if shared_memory is None:
+                shared_memory = isinstance(executor, ProcessPoolExecutor)
+            if shared_memory:
+                return run_shared_rows(executor, _batch_rows_shared, X, len(self.get_val(list(X[0]))), starts, stops,
+                                       self.function, chunk_size)
+            results = list(executor.map(_batch_rows, [self.function] * len(starts), [X[start:stop] for start, stop in zip(starts, stops)],
+                                        [chunk_size] * len(starts)))
+            return np.concatenate([vals for vals, _ in results]), np.concatenate([jacob for _, jacob in results])
+        batch_shape = X.shape[:1]
+
+        vals, jacob = None, []
+        for curr, block in self._jacobian_blocks(list(X.T), chunk_size, batch_shape):
+            if vals is None:
+                vals = np.array([np.broadcast_to(val.real if type(val) == DualNumber else val, batch_shape)
+                                 for val in curr], dtype=float).reshape((-1,) + batch_shape)
+            jacob.append(block)
+
+        # (m, n, N) -> (N, m, n)
+        return vals.T, np.concatenate(jacob, axis=1).transpose(2, 0, 1)
+
+    def compile(self):
+        # Trace once and replay a straight-line forward-mode program; cached on the instance
+        if self.compiled is None or self.compiled.func is not self.function:
+            self.compiled = CompiledFunction(self.function, mode='forward')
+        return self.compiled
 
 
 
 class ReverseAutoDiff():
 
-    #initialize ReverseAutoDiff object which stores func, dictionary of partials, and root nodes
-    #need for all 3 of these becomes clear in the functions below
-    def __init__(self, func):
+    #initialize ReverseAutoDiff object which stores func and the root nodes of the last evaluation
+    #mode='graph' links ReverseNode objects, mode='tape' records into an array-backed tape.Tape,
+    #mode='tensor' passes the whole input vector as one array-valued tensor.TensorNode
+    #cache_size enables a bounded cache of values and Jacobians keyed on the input bytes
+    #incremental keeps the tape of the last get_vals/get_jacobian call and updates only the rows that
+    #changed inputs reach (an incremental.IncrementalTape); it takes the place of mode in those two calls
+    def __init__(self, func, mode='graph', cache_size=None, cache_eviction='lru', incremental=False):
+        if mode not in ('graph', 'tape', 'tensor'):
+            raise ValueError("mode must be either 'graph', 'tape' or 'tensor'.")
+        self.cache = None if cache_size is None else ResultCache(cache_size, cache_eviction)
+        self.incremental = IncrementalTape(func) if incremental else None
         self.func = func
-        self.partials = {}
+        self.mode = mode
         self.bases = None
+        self.graph = None
+        self.compiled = None
+
+    #results cached for the old function are stale once it is replaced
+    @property
+    def func(self):
+        return self._func
+
+    @func.setter
+    def func(self, func):
+        self._func = func
+        if self.cache is not None:
+            self.cache.clear()
+        if self.incremental is not None and self.incremental.func is not func:
+            self.incremental = IncrementalTape(func)
+
+    #root nodes of the last evaluation; only weakly referenced unless its graph was retained, so the
+    #instance never keeps a finished graph (or, through its TapeNodes, a whole tape) alive
+    @property
+    def bases(self):
+        if self._bases is None:
+            return None
+        return [base() if isinstance(base, weakref.ref) else base for base in self._bases]
+
+    @bases.setter
+    def bases(self, bases):
+        self._bases = bases
+
+    #retain_graph=True keeps the bases and the output nodes (self.graph) for further sweeps
+    def _keep(self, bases, graph, retain_graph):
+        if retain_graph:
+            self.bases, self.graph = bases, graph
+        else:
+            self.bases, self.graph = [weakref.ref(base) for base in bases], None
+
+    #order the graph below initial_nodes so every node comes after all of its children
+    @staticmethod
+    def _topological_order(initial_nodes):
+        return topological_order(initial_nodes, lambda node: (node.child0, node.child1))
+
+    #push the adjoints of order (topologically sorted) down to the leaves, storing them on the nodes
+    #every node is reached after all of its parents, so its accumulated adjoint is final when we push it down
+    #interior adjoints are dropped once pushed; without retain_graph the node's edges are severed as well,
+    #so each part of the graph can be freed as soon as the sweep has passed it
+    @staticmethod
+    def _sweep(order, retain_graph=True):
+        for node in reversed(order):
+            child0, child1 = node.child0, node.child1
+            if child0 is None:
+                continue
+            current_trace = node.adjoint
+            if current_trace is not None:
+                contribution = current_trace*node.gradient0
+                child0.adjoint = contribution if child0.adjoint is None else child0.adjoint + contribution
+                if child1 is not None:
+                    contribution = current_trace*node.gradient1
+                    child1.adjoint = contribution if child1.adjoint is None else child1.adjoint + contribution
+            node.adjoint = None
+            if not retain_graph:
+                node.child0 = node.child1 = node.gradient0 = node.gradient1 = None
+
+    @staticmethod
+    def _take_adjoints(respect_to):
+        #read (and clear) the adjoints left on the leaves; unreached leaves have a zero adjoint
+        adjoints = []
+        for base in respect_to:
+            adjoints.append(0 if base.adjoint is None else base.adjoint)
+            base.adjoint = None
+        return adjoints
 
     #function below calculates the partials from the end of the graph back to the roots
     #initial_node is the final node in the graph (counterintuitive but beginning of reverse trace)
-    def _get_partials(self, initial_node, trace):
-
-        #for each child of the final node
-        for i in range(len(initial_node.child_pointers)):
-
-            #set the trace for each iteration multiply trace by the partial at child (trace starts at 1)
-            current_trace = 0
-            current_trace = trace*initial_node.gradient[i]
-
-            #using dictionary object in init add to existing trace if child already in dict
-            #if not already in dict create new partials dict entry for this trace
-            #this is useful because there may be multiple traces leading to root's partial
-            if str(id(initial_node.child_pointers[i])) in self.partials.keys():
-                self.partials[str(id(initial_node.child_pointers[i]))] += current_trace
-            else:
-                self.partials[str(id(initial_node.child_pointers[i]))] = current_trace
-            
-            #call this recursively for the children of the children
-            self._get_partials(initial_node.child_pointers[i], current_trace)
+    def _get_partials(self, initial_node, trace, retain_graph=True):
+
+        #seed the final node with the incoming trace, then sweep the nodes in reverse topological order
+        order = self._topological_order([initial_node])
+        for node in order:
+            node.adjoint = None
+        initial_node.adjoint = trace
+        self._sweep(order, retain_graph)
     
 
-    def _get_base_partials_1d(self, func_1d, respect_to):
+    def _get_base_partials_1d(self, func_1d, respect_to, retain_graph=True):
         #used for multidimensional derivative, calculate derivative for each partial for each variable
-        self.partials = {str(id(base)): 0 for base in respect_to}
+        for base in respect_to:
+            base.adjoint = None
         if type(func_1d) == ReverseNode:
-            self._get_partials(func_1d, 1)
-            return [self.partials[str(id(base))] for base in respect_to]
-        else:
-            return [0 for _ in respect_to]
-
-
-    def get_jacobian(self, vals):
+            self._get_partials(func_1d, 1, retain_graph)
+        return self._take_adjoints(respect_to)
+
+
+    def _get_base_partials_nd(self, funcs, respect_to, seeds=None, retain_graph=True):
+        #one backward sweep for several outputs: each node carries a len(funcs)-wide adjoint vector,
+        #so nodes shared between outputs are visited once instead of once per output
+        #seeds replaces the unit vectors with one adjoint seed per output (scalars give a vector-Jacobian product)
+        m = len(funcs)
+        if seeds is None:
+            seeds = np.eye(m)
+        shape = np.shape(seeds[0]) if m else (0,)
+        for base in respect_to:
+            base.adjoint = None
+        roots = [func_1d for func_1d in funcs if type(func_1d) == ReverseNode]
+        order = self._topological_order(roots)
+        for node in order:
+            node.adjoint = None
+        for k, func_1d in enumerate(funcs):
+            if type(func_1d) == ReverseNode:
+                func_1d.adjoint = seeds[k] if func_1d.adjoint is None else func_1d.adjoint + seeds[k]
+
+        self._sweep(order, retain_graph)
+        adjoints = np.array([np.broadcast_to(adjoint, shape) for adjoint in self._take_adjoints(respect_to)], dtype=float)
+        return adjoints.reshape((len(respect_to),) + shape).T
+
+    def _get_tape_jacobian(self, vals, block_size=None, retain_graph=False):
+        #record the function once, then one vector-adjoint sweep over the tape per block of outputs
+        #inputs are the first len(vals) rows, so their adjoints are the leading rows of the result
+        recording = tape.Tape()
+        bases = [recording.variable(val) for val in vals]
+        graph = list(self.func(bases))
+        self._keep(bases, graph, retain_graph)
+        if len(graph) == 1:
+            if isinstance(graph[0], tape.TapeNode):
+                return recording.backward(graph[0].index)[:len(vals)]
+            return np.zeros(len(vals))
+
+        block_size = len(graph) if block_size is None else block_size
+        blocks = []
+        for start in range(0, len(graph), block_size):
+            outputs = graph[start:start + block_size]
+            rows = [out.index if isinstance(out, tape.TapeNode) else -1 for out in outputs]
+            blocks.append(recording.backward_many(rows, upto=len(vals)).T)
+        return np.vstack(blocks)
+
+    #in tensor mode func receives the inputs as a single (n,) TensorNode, so W @ x or x.sum() is one node
+    #whatever its size; it may return one array node or a list of scalar nodes, flattened into one (m,) node
+    def _get_tensor_outputs(self, vals):
+        base = tensor.TensorNode(np.asarray(vals, dtype=float))
+        graph = self.func(base)
+        if not isinstance(graph, tensor.TensorNode):
+            graph = tensor.stack(list(graph))
+        return base, graph.reshape(-1)
+
+    def _get_tensor_jacobian(self, vals, retain_graph=False):
+        #one whole-array backward sweep per output; the graph is only released by the last one
+        base, output = self._get_tensor_outputs(vals)
+        self._keep([base], [output], retain_graph)
+        if output.size == 1:
+            return tensor.grad(output, [base], retain_graph=retain_graph)[0]
+        seeds = np.eye(output.size)
+        return np.array([tensor.grad(output, [base], seed=seed, retain_graph=retain_graph or k < len(seeds) - 1)[0]
+                         for k, seed in enumerate(seeds)])
+
+    def get_jacobian(self, vals, block_size=None, retain_graph=False):
+        #block_size bounds the adjoint width for functions with many outputs (default: all outputs in one sweep)
+        #retain_graph keeps the graph intact (and referenced from self.bases/self.graph) after the sweep;
+        #a cached Jacobian has no graph behind it, so retain_graph=True always evaluates
+        if block_size is not None and block_size < 1:
+            raise ValueError('block_size must be a positive integer.')
+        if self.cache is not None and not retain_graph:
+            return self.cache.lookup('jacobians', vals, lambda: self._get_jacobian(vals, block_size, retain_graph))
+        return self._get_jacobian(vals, block_size, retain_graph)
+
+    def _get_jacobian(self, vals, block_size, retain_graph):
+        if self.incremental is not None:
+            jacob = self.incremental.evaluate(vals)[1]
+            return jacob[0] if len(jacob) == 1 else jacob
+        if self.mode == 'tensor':
+            return self._get_tensor_jacobian(vals, retain_graph)
+        if self.mode == 'tape':
+            return self._get_tape_jacobian(vals, block_size, retain_graph)
 
         #run self.partial for each value in the function (single or multidimensional inputs)
-        self.bases = [ReverseNode(val) for val in vals]
-        graph = self.func(self.bases)
-        self.partials = {}
+        bases = [ReverseNode(val) for val in vals]
+        graph = self.func(bases)
+        self._keep(bases, graph, retain_graph)
         if len(graph) == 1: # If the function is multivariate
-            self._get_partials(self.func, 1)
-            return np.array([self.partials[str(id(base))] for base in self.bases])
+            return np.array(self._get_base_partials_1d(graph[0], respect_to=bases, retain_graph=retain_graph))
         else:
-            return np.array([self._get_base_partials_1d(func, respect_to=self.bases) for func in graph])
+            #blocks of outputs share the graph, so only the last sweep may release it
+            block_size = len(graph) if block_size is None else block_size
+            return np.vstack([self._get_base_partials_nd(graph[start:start + block_size], respect_to=bases,
+                                                         retain_graph=retain_graph or start + block_size < len(graph))
+                              for start in range(0, len(graph), block_size)])
 
 
     def get_vals(self, vals):
-        self.bases = [ReverseNode(val) for val in vals]
+        if self.cache is not None:
+            return self.cache.lookup('values', vals, lambda: self._get_vals(vals))
+        return self._get_vals(vals)
+
+    def _get_vals(self, vals):
+        if self.incremental is not None:
+            return self.incremental.evaluate(vals)[0]
+        if self.mode == 'tensor':
+            base, graph = self._get_tensor_outputs(vals)
+            self._keep([base], [graph], False)
+            return np.array(graph.val)
+        if self.mode == 'tape':
+            recording = tape.Tape()
+            bases = [recording.variable(val) for val in vals]
+        else:
+            bases = [ReverseNode(val) for val in vals]
         output = []
 
         #follow each node in the "forward run" to the end of the graph and find the final output
-        for val in self.func(self.bases):
-            if not type(val) == ReverseNode:
+        for val in self.func(bases):
+            if not type(val) in (ReverseNode, tape.TapeNode):
                 output.append(val)
             else:
                 output.append(val.val)
+        self._keep(bases, None, False)
         return np.array(output)
 
 
-    def reverse_mode(self, vals):
-        return self.get_vals(vals), self.get_jacobian(vals)
+    def reverse_mode(self, vals, retain_graph=False):
+        return self.get_vals(vals), self.get_jacobian(vals, retain_graph=retain_graph)
+
+    #reverse_mode at every row of an (N, n) matrix; returns (N, m) values and (N, m, n) Jacobians
+    #with an executor, blocks of rows (row_chunk_size, default one block per CPU) run in parallel
+    #shared_memory (default: on for process pools) passes X and the outputs through shared memory, not pickles
+    def reverse_mode_batch(self, X, executor=None, row_chunk_size=None, shared_memory=None):
+        X = np.asarray(X, dtype=float)
+        if X.ndim != 2 or X.shape[0] == 0:
+            raise ValueError('Input must be a non-empty (N, n) array of points.')
+        if executor is not None:
+            starts, stops = AutoDiff._executor_blocks(X.shape[0], row_chunk_size)
+            if shared_memory is None:
+                shared_memory = isinstance(executor, ProcessPoolExecutor)
+            if shared_memory:
+                return run_shared_rows(executor, _reverse_rows_shared, X, len(self.get_vals(list(X[0]))), starts, stops,
+                                       self.func, self.mode)
+            results = list(executor.map(_reverse_rows, [self.func] * len(starts), [self.mode] * len(starts),
+                                        [X[start:stop] for start, stop in zip(starts, stops)]))
+            return np.concatenate([vals for vals, _ in results]), np.concatenate([jacob for _, jacob in results])
+
+        vals, jacob = [], []
+        for row in X.tolist():
+            values, jac = self.reverse_mode(row)
+            vals.append(values)
+            jacob.append(np.reshape(jac, (len(values), len(row))))
+        return np.array(vals, dtype=float), np.array(jacob, dtype=float)
+
+    #vector-Jacobian product u^T J from one evaluation and one backward sweep seeded with u
+    def vjp(self, vals, u, retain_graph=False):
+        u = np.asarray(u, dtype=float)
+        if self.mode == 'tensor':
+            base, output = self._get_tensor_outputs(vals)
+            if u.shape != output.shape:
+                raise ValueError('u must have one entry per function output.')
+            self._keep([base], [output], retain_graph)
+            return np.array(output.val), tensor.grad(output, [base], seed=u, retain_graph=retain_graph)[0]
+        if self.mode == 'tape':
+            recording = tape.Tape()
+            bases = [recording.variable(val) for val in vals]
+        else:
+            bases = [ReverseNode(val) for val in vals]
+        graph = list(self.func(bases))
+        if u.shape != (len(graph),):
+            raise ValueError('u must have one entry per function output.')
+        self._keep(bases, graph, retain_graph)
+
+        values = np.array([out.val if type(out) in (ReverseNode, tape.TapeNode) else out for out in graph], dtype=float)
+        if self.mode == 'tape':
+            rows = [out.index if isinstance(out, tape.TapeNode) else -1 for out in graph]
+            return values, recording.backward_many(rows, upto=len(vals), seeds=u)
+        return values, self._get_base_partials_nd(graph, respect_to=bases, seeds=u, retain_graph=retain_graph)
+
+    #Hessian-vector product by forward-over-reverse: node values are DualNumbers seeded with v,
+    #so the reverse sweep carries d/dt grad f(x + t v) = H v in the dual parts of the adjoints
+    #v may also be an (n, k) matrix of directions, giving H v for all k columns in one sweep
+    #always runs on the ReverseNode graph (the tape stores plain floats) for the first output
+    def hvp(self, vals, v):
+        v = np.asarray(v, dtype=float)
+        if v.shape[:1] != (len(vals),):
+            raise ValueError('v must have one row per input.')
+        bases = [ReverseNode(DualNumber(val, direction)) for val, direction in zip(vals, v)]
+        output = self.func(bases)[0]
+        self._keep(bases, None, False)
+        if type(output) != ReverseNode:
+            return np.zeros(v.shape)
+        for base in bases:
+            base.adjoint = None
+        self._get_partials(output, 1, retain_graph=False)
+        return np.array([np.broadcast_to(getattr(adjoint, 'dual', 0), v.shape[1:]) for adjoint in self._take_adjoints(bases)], dtype=float)
+
+    #full Hessian of the first output: H v with v the identity, i.e. one seeded sweep with n-wide dual parts
+    def hessian(self, vals):
+        return self.hvp(vals, np.eye(len(vals)))
+
+    #trace once and replay a straight-line reverse-mode program; cached on the instance
+    def compile(self):
+        if self.compiled is None or self.compiled.func is not self.func:
+            self.compiled = CompiledFunction(self.func, mode='reverse')
+        return self.compiled
+
+
+
+class AdaptiveAutoDiff():
+    '''
+    Front-end that picks forward or reverse mode from a cost model
+
+    A probe evaluation records the function onto a tape to count its ops and outputs.
+    Forward (vector) mode pays a per-op cost that grows slowly with the seed width n plus
+    the n x n seed itself; reverse mode pays one recording plus a single backward sweep,
+    with float adjoints for one output and m-wide vector adjoints (a larger fixed per-op
+    cost that grows only slowly with m) otherwise. The weights are rough microsecond
+    timings of the two engines and can be overridden per instance. Decisions are cached
+    per function and input length.
+    '''
+    FORWARD_OP_COST = 6.5
+    FORWARD_DIRECTION_COST = 0.005
+    FORWARD_SEED_COST = 0.002
+    REVERSE_RECORD_COST = 3.0
+    REVERSE_SWEEP_COST = 2.7
+    REVERSE_VECTOR_SWEEP_COST = 9.5
+    REVERSE_WIDTH_COST = 0.005
+
+    def __init__(self, function):
+        self.function = function
+        self.decisions = {}
+        self.decision = None
+        self.costs = None
+
+    def estimate_costs(self, vec):
+        recording, n, outputs = trace(self.function, vec)
+        ops, m = recording.size - n, len(outputs)
+        return {
+            'ops': ops,
+            'inputs': n,
+            'outputs': m,
+            'forward': ops * (self.FORWARD_OP_COST + self.FORWARD_DIRECTION_COST * n) + self.FORWARD_SEED_COST * n * n,
+            'reverse': ops * (self.REVERSE_RECORD_COST + (self.REVERSE_SWEEP_COST if m == 1 else
+                                                          self.REVERSE_VECTOR_SWEEP_COST + self.REVERSE_WIDTH_COST * m)),
+        }
+
+    def choose(self, vec):
+        # Probe once per function and input length, then reuse the decision
+        key = (self.function, len(vec))
+        if key not in self.decisions:
+            costs = self.estimate_costs(vec)
+            self.decisions[key] = ('forward' if costs['forward'] <= costs['reverse'] else 'reverse', costs)
+        self.decision, self.costs = self.decisions[key]
+        return self.decision
+
+    def get_val(self, vec=None):
+        if not vec:
+            raise ValueError('No val has been passed into AdaptiveAutoDiff instance.')
+        return AutoDiff(self.function).get_val(vec)
+
+    def get_jacobian(self, vec=None):
+        # Always (m, n), whichever engine ran
+        if not vec:
+            raise ValueError('No val has been passed into AdaptiveAutoDiff instance.')
+        if self.choose(vec) == 'forward':
+            return AutoDiff(self.function).get_jacobian(vec)
+        return ReverseAutoDiff(self.function).get_jacobian(vec).reshape(-1, len(vec))
+
+    def evaluate(self, vec=None):
+        return self.get_val(vec), self.get_jacobian(vec)
 
 
 
@@ -0,0 +1,100 @@
+#bounded memoization of value and Jacobian queries, keyed on the bytes of the input vector
+from collections import OrderedDict
+import numpy as np
+
+
+def input_key(vec):
+    '''
+    Cache key of an input vector: its float64 bytes plus its shape
+    '''
+    vec = np.ascontiguousarray(vec, dtype=float)
+    return vec.shape, vec.tobytes()
+
+
+class LRUCache():
+    '''
+    Bounded mapping with hit/miss statistics
+
+    eviction='lru' drops the least recently used entry when full, 'fifo' the oldest
+    inserted one regardless of later hits. Arrays are copied on the way in and out, so
+    callers can never modify a cached result.
+    '''
+
+    def __init__(self, maxsize=128, eviction='lru'):
+        if maxsize < 1:
+            raise ValueError('maxsize must be a positive integer.')
+        if eviction not in ('lru', 'fifo'):
+            raise ValueError("eviction must be either 'lru' or 'fifo'.")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return "{class_name}(maxsize={maxsize}, eviction={eviction})".format(class_name=type(self).__name__, maxsize=self.maxsize, eviction=self.eviction)
+
+    def get(self, key):
+        # Returns None on a miss
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == 'lru':
+            self.entries.move_to_end(key)
+        return np.copy(value)
+
+    def put(self, key, value):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+        self.entries[key] = np.copy(value)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.entries), 'maxsize': self.maxsize}
+
+
+class ResultCache():
+    '''
+    Separate value and Jacobian caches for one differentiated function
+
+    A value-only query can be answered by an earlier forward_mode/reverse_mode call, and
+    a Jacobian query never evicts cached values (or the other way around).
+    '''
+
+    def __init__(self, maxsize=128, eviction='lru'):
+        self.values = LRUCache(maxsize, eviction)
+        self.jacobians = LRUCache(maxsize, eviction)
+
+    def __repr__(self):
+        return "{class_name}(maxsize={maxsize}, eviction={eviction})".format(class_name=type(self).__name__, maxsize=self.values.maxsize, eviction=self.values.eviction)
+
+    def lookup(self, name, vec, compute):
+        # Serve the 'values' or 'jacobians' entry for vec, calling compute() and storing its result on a miss
+        store = getattr(self, name)
+        key = input_key(vec)
+        result = store.get(key)
+        if result is None:
+            result = compute()
+            store.put(key, result)
+        return result
+
+    def clear(self):
+        # Entries go, statistics stay
+        self.values.clear()
+        self.jacobians.clear()
+
+    def info(self):
+        return {'values': self.values.info(), 'jacobians': self.jacobians.info()}
@@ -0,0 +1,155 @@
+#checkpointed reverse mode for long iterative computations
+#only a bounded number of intermediate states are stored; the steps between them are recomputed
+#during the backward sweep, following the binomial (revolve) schedule of Griewank and Walther
+from math import comb
+import numpy as np
+try:
+    from .ad import ReverseAutoDiff
+    from . import tensor
+except ImportError:
+    from ad import ReverseAutoDiff
+    import tensor
+
+
+def binomial(snapshots, repetitions):
+    '''
+    Longest loop reversible with the given snapshots when no step runs forward more than
+    repetitions times: C(snapshots + repetitions, snapshots)
+    '''
+    return comb(snapshots + repetitions, snapshots)
+
+
+def repetitions_for(n_steps, snapshots):
+    # Smallest recomputation factor that reverses n_steps with this many snapshots
+    if snapshots == 0:
+        #every state is recomputed from x_0: the step before the last runs n_steps - 1 times
+        return max(n_steps - 1, 0)
+    t = 0
+    while binomial(snapshots, t) < n_steps:
+        t += 1
+    return t
+
+
+def snapshots_for(n_steps, repetitions):
+    # Fewest snapshots that reverse n_steps without exceeding the recomputation factor
+    if repetitions < 1 and n_steps > 1:
+        raise ValueError('repetitions must be at least 1 for loops longer than one step.')
+    s = 0
+    while binomial(s, repetitions) < n_steps:
+        s += 1
+    return s
+
+
+class CheckpointedLoop():
+    '''
+    Reverse mode through the loop x_{k+1} = step(x_k) for k < n_steps
+
+    step takes and returns a list of values like any ReverseAutoDiff function. The forward
+    pass keeps at most snapshots intermediate states besides x_0; the backward sweep
+    restores the nearest snapshot and recomputes forwards from it, so each step is
+    evaluated forwards at most repetitions times (plus once inside its own backward step).
+    Give either snapshots or repetitions, the other follows from the binomial bound.
+    After each call, advances counts forward step evaluations, peak_snapshots the most
+    states held at once, and schedule (when record=True) lists the actions taken.
+    '''
+
+    def __init__(self, step, n_steps, snapshots=None, repetitions=None, mode='graph', record=False):
+        if n_steps < 1:
+            raise ValueError('n_steps must be a positive integer.')
+        if snapshots is None and repetitions is None:
+            raise ValueError('Give either snapshots or repetitions.')
+        if snapshots is None:
+            snapshots = snapshots_for(n_steps, repetitions)
+        self.step = step
+        self.n_steps = n_steps
+        self.snapshots = snapshots
+        self.repetitions = repetitions_for(n_steps, snapshots)
+        self.engine = ReverseAutoDiff(step, mode=mode)
+        self.record = record
+        self.schedule = []
+        self.advances = 0
+        self.peak_snapshots = 0
+
+    def __repr__(self):
+        return "{class_name}(n_steps={n_steps}, snapshots={snapshots}, repetitions={repetitions})".format(
+            class_name=type(self).__name__, n_steps=self.n_steps, snapshots=self.snapshots, repetitions=self.repetitions)
+
+    def _advance(self, state, start, stop):
+        if self.record:
+            self.schedule.append(('advance', start, stop))
+        for _ in range(start, stop):
+            state = self.engine.get_vals(state).tolist()
+        self.advances += stop - start
+        return state
+
+    def _step_vjp(self, state, adjoint, i):
+        if self.record:
+            self.schedule.append(('reverse', i))
+        values, product = self.engine.vjp(state, adjoint)
+        if i == self.n_steps - 1:
+            #the last step's values are x_n, so vjp needs no forward pass of its own
+            self._output = values
+        return product
+
+    def _reverse(self, i, j, snapshots, state, adjoint, held):
+        #adjoint of x_i from the stored state x_i and the adjoint of x_j, with snapshots free slots
+        while j - i > 1:
+            if snapshots == 0:
+                #no free slot: recompute every state of the segment from x_i
+                adjoint = self._step_vjp(self._advance(state, i, j - 1), adjoint, j - 1)
+                j -= 1
+                continue
+            #split so the right part fits snapshots - 1 slots and the left part one repetition less
+            m = i + max(1, (j - i) - binomial(snapshots - 1, repetitions_for(j - i, snapshots)))
+            middle = self._advance(state, i, m)
+            if self.record:
+                self.schedule.append(('snapshot', m))
+            self.peak_snapshots = max(self.peak_snapshots, held + 1)
+            adjoint = self._reverse(m, j, snapshots - 1, middle, adjoint, held + 1)
+            if self.record:
+                self.schedule.append(('restore', i))
+            j = m
+        return self._step_vjp(state, adjoint, i)
+
+    def get_vals(self, x0):
+        self.advances = 0
+        return np.array(self._advance(list(x0), 0, self.n_steps), dtype=float)
+
+    def vjp(self, x0, u):
+        '''
+        x_n and u^T dx_n/dx_0
+        '''
+        self.schedule, self.advances, self.peak_snapshots = [], 0, 0
+        x0 = [float(val) for val in x0]
+        u = np.asarray(u, dtype=float)
+        if u.shape != (len(x0),):
+            raise ValueError('u must have one entry per state variable.')
+        product = self._reverse(0, self.n_steps, self.snapshots, x0, u, 0)
+        return np.asarray(self._output, dtype=float), np.asarray(product, dtype=float)
+
+    def get_jacobian(self, x0):
+        # one checkpointed reversal per state variable
+        return np.array([self.vjp(x0, seed)[1] for seed in np.eye(len(x0))])
+
+    def gradient(self, x0, objective):
+        '''
+        Gradient of objective(x_n) with respect to x_0 for a scalar objective(list) -> [value]
+        '''
+        values = self.get_vals(x0)
+        u = np.reshape(ReverseAutoDiff(objective).get_jacobian(values.tolist()), -1)
+        return self.vjp(x0, u)[1]
+
+
+def checkpoint(segment, x):
+    '''
+    Apply segment to the TensorNode x without keeping its intermediate nodes
+
+    The forward pass runs segment on a detached copy of x and keeps only x and the result;
+    the backward rule re-runs segment to rebuild the discarded graph, then sweeps it.
+    '''
+    val = segment(tensor.TensorNode(x.val)).val
+
+    def vjp(g):
+        inner = tensor.TensorNode(x.val)
+        return tensor.grad(segment(inner), [inner], seed=g)[0]
+    return tensor.TensorNode(val, (x,), (vjp,))
@@ -0,0 +1,470 @@
+#trace-once, replay-many compilation of user functions
+#the function is recorded once onto a tape.Tape and lowered to straight-line NumPy source
+#that evaluates the outputs and the Jacobian with no per-op node objects
+import operator
+import numpy as np
+try:
+    from . import tape
+    from . import serialize
+except ImportError:
+    import tape
+    import serialize
+
+#value rule per op code: {a}/{b} are the parent variables, {c} the op constant, {v} the node itself
+VALUE_RULES = {
+    tape.ADD: '{a} + {b}', tape.SUB: '{a} - {b}', tape.MUL: '{a} * {b}', tape.DIV: '{a} / {b}', tape.POW: '{a} ** {b}',
+    tape.ADD_CONST: '{a} + {c}', tape.RSUB_CONST: '{c} - {a}', tape.MUL_CONST: '{a} * {c}',
+    tape.DIV_CONST: '{a} / {c}', tape.RDIV_CONST: '{c} / {a}', tape.POW_CONST: '{a} ** {c}',
+    tape.RPOW_CONST: '{c} ** {a}', tape.NEG: '-{a}', tape.POS: '{a}',
+    tape.SIN: 'np.sin({a})', tape.COS: 'np.cos({a})', tape.TAN: 'np.tan({a})', tape.EXP: 'np.exp({a})',
+    tape.ARCSIN: 'np.arcsin({a})', tape.ARCCOS: 'np.arccos({a})', tape.ARCTAN: 'np.arctan({a})',
+    tape.SINH: 'np.sinh({a})', tape.COSH: 'np.cosh({a})', tape.TANH: 'np.tanh({a})',
+    tape.LOGISTIC: '1 / (1 + np.exp(-{a}))', tape.SQRT: 'np.sqrt({a})', tape.LOG: 'np.log({a}) / np.log({c})',
+}
+
+#local partial rules per op code, one entry per parent; '1' and '-1' are emitted as plain adds/subtracts
+PARTIAL_RULES = {
+    tape.ADD: ('1', '1'), tape.SUB: ('1', '-1'), tape.MUL: ('{b}', '{a}'), tape.DIV: ('1 / {b}', '-{v} / {b}'),
+    tape.POW: ('{b} * {a} ** ({b} - 1)', '{v} * np.log({a})'),
+    tape.ADD_CONST: ('1',), tape.RSUB_CONST: ('-1',), tape.MUL_CONST: ('{c}',), tape.DIV_CONST: ('1 / {c}',),
+    tape.RDIV_CONST: ('-{v} / {a}',), tape.POW_CONST: ('{c} * {a} ** ({c} - 1)',),
+    tape.RPOW_CONST: ('{v} * np.log({c})',), tape.NEG: ('-1',), tape.POS: ('1',),
+    tape.SIN: ('np.cos({a})',), tape.COS: ('-np.sin({a})',), tape.TAN: ('1 / np.cos({a}) ** 2',),
+    tape.EXP: ('{v}',), tape.ARCSIN: ('1 / np.sqrt(1 - {a} ** 2)',), tape.ARCCOS: ('-1 / np.sqrt(1 - {a} ** 2)',),
+    tape.ARCTAN: ('1 / (1 + {a} ** 2)',), tape.SINH: ('np.cosh({a})',), tape.COSH: ('np.sinh({a})',),
+    tape.TANH: ('1 / np.cosh({a}) ** 2',), tape.LOGISTIC: ('{v} * (1 - {v})',), tape.SQRT: ('0.5 / {v}',),
+    tape.LOG: ('1 / ({a} * np.log({c}))',),
+}
+
+
+class GuardFailure(Exception):
+    '''
+    Raised by a compiled program when a recorded comparison flips for the new input
+    '''
+
+
+def _literal(c):
+    #constants are inlined into the generated source
+    c = float(c)
+    if np.isfinite(c):
+        return repr(c)
+    return 'np.nan' if np.isnan(c) else ('np.inf' if c > 0 else '-np.inf')
+
+
+def trace(func, vals):
+    '''
+    Record func at vals onto a fresh tape
+
+    Returns the tape, the number of inputs and one output spec per function output:
+    ('node', row) for traced outputs and ('const', value) for plain numbers.
+    '''
+    recording = tape.Tape()
+    bases = [recording.variable(val) for val in vals]
+    outputs = []
+    for out in func(bases):
+        if isinstance(out, tape.TapeNode):
+            outputs.append(('node', out.index))
+        else:
+            outputs.append(('const', float(out)))
+    return recording, len(bases), outputs
+
+
+_BLOCK = 65536
+
+
+def _live_rows(recording, outputs):
+    #rows that some output or guard depends on, in tape (topological) order
+    live = np.zeros(recording.size, dtype=bool)
+    for kind, row in outputs:
+        if kind == 'node':
+            live[row] = True
+    for _, row, other, _, _ in recording.guards:
+        live[row] = True
+        if other >= 0:
+            live[other] = True
+    #rows are converted to plain lists one block at a time, like Tape.backward: element access on
+    #NumPy rows is much slower, and a memmapped tape is read a block at a time instead of copied whole
+    for stop in range(recording.size, 0, -_BLOCK):
+        start = max(stop - _BLOCK, 0)
+        parents = recording.parents[start:stop].tolist()
+        for k in range(stop - start - 1, -1, -1):
+            if live[start + k]:
+                for p in parents[k]:
+                    if p >= 0:
+                        live[p] = True
+    return np.flatnonzero(live)
+
+
+def _live_steps(recording, outputs):
+    #(row, op, parent 0, parent 1, const) of every live non-input row, in tape order,
+    #read from the tape one block of rows at a time
+    rows = _live_rows(recording, outputs)
+    steps = []
+    for start in range(0, recording.size, _BLOCK):
+        stop = min(start + _BLOCK, recording.size)
+        block = rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+        ops = recording.ops[block].tolist()
+        parents = recording.parents[block].tolist()
+        consts = recording.consts[block].tolist()
+        steps.extend((i, op, p0, p1, c) for i, op, (p0, p1), c in zip(block.tolist(), ops, parents, consts)
+                     if op != tape.INPUT)
+    return steps
+
+
+#a binary op with one constant parent becomes a one-parent op; keyed by (op, node parent comes first),
+#giving the new op and the sign its constant takes (x - c is recorded as x + (-c), like TapeNode.__sub__)
+_CONST_FORMS = {
+    (tape.ADD, True): (tape.ADD_CONST, 1), (tape.ADD, False): (tape.ADD_CONST, 1),
+    (tape.SUB, True): (tape.ADD_CONST, -1), (tape.SUB, False): (tape.RSUB_CONST, 1),
+    (tape.MUL, True): (tape.MUL_CONST, 1), (tape.MUL, False): (tape.MUL_CONST, 1),
+    (tape.DIV, True): (tape.DIV_CONST, 1), (tape.DIV, False): (tape.RDIV_CONST, 1),
+    (tape.POW, True): (tape.POW_CONST, 1), (tape.POW, False): (tape.RPOW_CONST, 1),
+}
+
+#one-parent ops that return their parent unchanged for this constant
+_IDENTITIES = {(tape.ADD_CONST, 0.0), (tape.MUL_CONST, 1.0), (tape.DIV_CONST, 1.0), (tape.POW_CONST, 1.0)}
+
+#ops whose value is a constant whatever the parent, assuming a finite parent value
+_ANNIHILATORS = {(tape.MUL_CONST, 0.0): 0.0, (tape.RDIV_CONST, 0.0): 0.0, (tape.POW_CONST, 0.0): 1.0}
+
+_FLIPPED = {'<': '>', '<=': '>=', '>': '<', '>=': '<=', '==': '==', '!=': '!='}
+
+
+def optimize(recording, n_inputs, outputs):
+    '''
+    Simplify a traced tape before it is lowered
+
+    Rows computing the same op of the same parents are merged into one (add and mul
+    regardless of operand order); rows whose parents are all constants are folded into
+    their traced value, binary ops with one constant parent become the matching
+    one-parent op, and identities such as x * 1, x + 0, +x or x ** 1 are replaced by
+    their parent (x * 0, 0 / x, x ** 0 and x - x fold to constants for finite x). Rows that
+    no output or guard depends on are dropped. Returns the new tape (its guards remapped
+    onto the new rows), the new outputs, and a report of the row counts before and after.
+    '''
+    size = recording.size
+    ops = recording.ops[:size].tolist()
+    parents = recording.parents[:size].tolist()
+    partials = recording.partials[:size].tolist()
+    values = recording.values[:size].tolist()
+    consts = recording.consts[:size].tolist()
+
+    #alias[i] is the row that now computes row i, or None when row i is the constant folded[i]
+    alias, folded = list(range(size)), [None] * size
+    rows, seen = {}, {}
+    merged = n_folded = 0
+    for i in range(n_inputs, size):
+        op, const = ops[i], consts[i]
+        operands = [(alias[p], folded[p], d) for p, d in zip(parents[i], partials[i]) if p >= 0]
+        if all(row is None for row, _, _ in operands):
+            #every parent is a constant, so the traced value is the constant
+            alias[i], folded[i] = None, values[i]
+            n_folded += 1
+            continue
+        if len(operands) == 2 and None in (operands[0][0], operands[1][0]):
+            node_first = operands[1][0] is None
+            op, sign = _CONST_FORMS[(op, node_first)]
+            const = sign * (operands[1][1] if node_first else operands[0][1])
+            operands = [operands[0] if node_first else operands[1]]
+        if len(operands) == 1 and (op == tape.POS or (op, const) in _IDENTITIES):
+            alias[i] = operands[0][0]
+            n_folded += 1
+            continue
+        if (op, const) in _ANNIHILATORS or (op == tape.SUB and operands[0][0] == operands[1][0]):
+            alias[i], folded[i] = None, _ANNIHILATORS.get((op, const), 0.0)
+            n_folded += 1
+            continue
+        if op in (tape.ADD, tape.MUL) and operands[0][0] > operands[1][0]:
+            operands.reverse()
+        key = (op, const) + tuple(row for row, _, _ in operands)
+        if key in seen:
+            alias[i] = seen[key]
+            merged += 1
+            continue
+        seen[key] = i
+        rows[i] = (op, const, operands)
+
+    def resolve(row):
+        return ('node', alias[row]) if alias[row] is not None else ('const', folded[row])
+
+    outputs = [resolve(row) if kind == 'node' else (kind, row) for kind, row in outputs]
+    guards = []
+    for op, row, other, const, outcome in recording.guards:
+        left = resolve(row)
+        right = resolve(other) if other >= 0 else ('const', const)
+        if left[0] == 'const' and right[0] == 'const':
+            #both sides are fixed, so the outcome cannot change
+            continue
+        if left[0] == 'const':
+            op, left, right = _FLIPPED[op], right, left
+        guards.append((op, left[1], right[1] if right[0] == 'node' else -1, right[1] if right[0] == 'const' else 0.0, outcome))
+
+    #keep every row an output or a guard reaches, walking the surviving rows backwards
+    live = set(range(n_inputs))
+    live.update(row for kind, row in outputs if kind == 'node')
+    for _, row, other, _, _ in guards:
+        live.update((row, other) if other >= 0 else (row,))
+    for i in sorted(rows, reverse=True):
+        if i in live:
+            live.update(row for row, _, _ in rows[i][2])
+
+    optimized = tape.Tape(capacity=max(len(live), 1))
+    index = {}
+    for i in range(n_inputs):
+        index[i] = optimized.variable(values[i]).index
+    for i in sorted(live):
+        if i < n_inputs:
+            continue
+        op, const, operands = rows[i]
+        args = []
+        for row, _, d in operands:
+            args += [index[row], d]
+        index[i] = optimized.record(op, values[i], *args, const=const).index
+    optimized.guards = [(op, index[row], index[other] if other >= 0 else -1, const, outcome)
+                        for op, row, other, const, outcome in guards]
+    outputs = [('node', index[row]) if kind == 'node' else (kind, row) for kind, row in outputs]
+    report = {'before': size, 'merged': merged, 'folded': n_folded,
+              'pruned': size - merged - n_folded - optimized.size, 'after': optimized.size}
+    return optimized, outputs, report
+
+
+def lower(recording, n_inputs, outputs, mode='reverse'):
+    '''
+    Lower a traced tape to the source of a straight-line NumPy program
+
+    The program takes the input vector and returns (values, jacobian). mode='reverse'
+    propagates one adjoint slot per output backwards; mode='forward' propagates one
+    tangent slot per input forwards.
+    '''
+    m = len(outputs)
+    steps = _live_steps(recording, outputs)
+
+    def fmt(template, i, p0, p1, c):
+        return template.format(a='v%d' % p0, b='v%d' % p1, c=_literal(c), v='v%d' % i)
+
+    #each guard is checked as soon as both of its operands exist, so a stale
+    #specialization bails out before the rest of the program runs
+    guards = {}
+    for op, row, other, const, outcome in recording.guards:
+        condition = 'v%d %s %s' % (row, op, 'v%d' % other if other >= 0 else _literal(const))
+        guard = '    if %s: raise _GuardFailure' % (condition if not outcome else 'not (%s)' % condition)
+        guards.setdefault(max(row, other, n_inputs - 1), []).append(guard)
+
+    lines = ['def _program(x):']
+    if n_inputs:
+        lines.append('    ' + ', '.join('v%d' % i for i in range(n_inputs)) + ', = x')
+        lines.extend(guards.get(n_inputs - 1, ()))
+    for i, op, p0, p1, c in steps:
+        lines.append('    v%d = %s' % (i, fmt(VALUE_RULES[op], i, p0, p1, c)))
+        lines.extend(guards.get(i, ()))
+    values = ', '.join('v%d' % row if kind == 'node' else _literal(row) for kind, row in outputs)
+    lines.append('    values = np.array([%s])' % values)
+
+    def accumulate(target, assigned, partial, source):
+        #emit target (+)= partial * source, skipping multiplications by +-1
+        if partial == '1':
+            term = source
+        elif partial == '-1':
+            term = '-' + source
+        else:
+            term = '(%s) * %s' % (partial, source)
+        if target in assigned:
+            lines.append('    %s = %s + %s' % (target, target, term))
+        else:
+            assigned.add(target)
+            lines.append('    %s = %s' % (target, term))
+
+    if mode == 'reverse':
+        #seed each output row with its unit adjoint, then sweep the live rows backwards
+        assigned = set()
+        for k, (kind, row) in enumerate(outputs):
+            if kind == 'node':
+                accumulate('a%d' % row, assigned, '1', '_E[%d]' % k)
+        for i, op, p0, p1, c in steps[::-1]:
+            if 'a%d' % i not in assigned:
+                continue
+            for p, template in zip((p0, p1), PARTIAL_RULES[op]):
+                accumulate('a%d' % p, assigned, fmt(template, i, p0, p1, c), 'a%d' % i)
+        columns = ', '.join('a%d' % i if 'a%d' % i in assigned else '_Z' for i in range(n_inputs))
+        lines.append('    return values, np.array([%s]).T.reshape(%d, %d)' % (columns, m, n_inputs))
+    elif mode == 'forward':
+        #seed each input with its unit tangent, then sweep the live rows forwards
+        assigned = {'t%d' % i for i in range(n_inputs)}
+        for i in range(n_inputs):
+            lines.append('    t%d = _E[%d]' % (i, i))
+        for i, op, p0, p1, c in steps:
+            for p, template in zip((p0, p1), PARTIAL_RULES[op]):
+                accumulate('t%d' % i, assigned, fmt(template, i, p0, p1, c), 't%d' % p)
+        rows_out = ', '.join('t%d' % row if kind == 'node' else '_Z' for kind, row in outputs)
+        lines.append('    return values, np.array([%s]).reshape(%d, %d)' % (rows_out, m, n_inputs))
+    else:
+        raise ValueError("mode must be either 'forward' or 'reverse'.")
+    return '\n'.join(lines) + '\n'
+
+
+#the value and partial rules above as functions of (a, b, c) and (a, b, c, v), for interpret
+VALUE_FUNCTIONS = {op: eval('lambda a, b, c: ' + template.format(a='a', b='b', c='c'), {'np': np})
+                   for op, template in VALUE_RULES.items()}
+PARTIAL_FUNCTIONS = {op: tuple(eval('lambda a, b, c, v: ' + template.format(a='a', b='b', c='c', v='v'), {'np': np})
+                               for template in templates)
+                     for op, templates in PARTIAL_RULES.items()}
+
+_COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+def interpret(recording, n_inputs, outputs, mode='reverse'):
+    '''
+    Program equivalent to the lowered source of a tape, evaluated by walking its rows
+
+    Nothing is generated or compiled, so it is ready as soon as the tape is, at the price
+    of a slower call than the lowered program; serialize.load_trace tapes replay this way
+    without paying for lower and compile at startup.
+    '''
+    m = len(outputs)
+    n = recording.size
+    steps = [(i, VALUE_FUNCTIONS[op], PARTIAL_FUNCTIONS[op], p0, p1, c) for i, op, p0, p1, c in _live_steps(recording, outputs)]
+    guards = {}
+    for op, row, other, const, outcome in recording.guards:
+        guards.setdefault(max(row, other, n_inputs - 1), []).append((_COMPARISONS[op], row, other, const, outcome))
+    width = m if mode == 'reverse' else n_inputs
+    seeds = np.eye(width)
+
+    def check(v, row):
+        for compare, row, other, const, outcome in guards.get(row, ()):
+            if bool(compare(v[row], v[other] if other >= 0 else const)) != outcome:
+                raise GuardFailure
+
+    def program(x):
+        v = list(x) + [0.0] * (n - n_inputs)
+        check(v, n_inputs - 1)
+        for i, value, _, p0, p1, c in steps:
+            v[i] = value(v[p0], v[p1], c)
+            if i in guards:
+                check(v, i)
+        values = np.array([v[row] if kind == 'node' else row for kind, row in outputs], dtype=float)
+        if mode == 'reverse':
+            #one adjoint vector per row, seeded with the unit vector of each output
+            adjoints = [None] * n
+            for k, (kind, row) in enumerate(outputs):
+                if kind == 'node':
+                    adjoints[row] = seeds[k] if adjoints[row] is None else adjoints[row] + seeds[k]
+            for i, _, partials, p0, p1, c in reversed(steps):
+                a = adjoints[i]
+                if a is None:
+                    continue
+                for p, partial in zip((p0, p1), partials):
+                    term = partial(v[p0], v[p1], c, v[i]) * a
+                    adjoints[p] = term if adjoints[p] is None else adjoints[p] + term
+            zero = np.zeros(m)
+            return values, np.array([zero if a is None else a for a in adjoints[:n_inputs]]).T.reshape(m, n_inputs)
+        #one tangent vector per row, seeded with the unit vector of each input
+        tangents = list(seeds) + [None] * (n - n_inputs)
+        for i, _, partials, p0, p1, c in steps:
+            total = None
+            for p, partial in zip((p0, p1), partials):
+                if tangents[p] is not None:
+                    term = partial(v[p0], v[p1], c, v[i]) * tangents[p]
+                    total = term if total is None else total + term
+            tangents[i] = total
+        zero = np.zeros(n_inputs)
+        return values, np.array([tangents[row] if kind == 'node' and tangents[row] is not None else zero
+                                 for kind, row in outputs]).reshape(m, n_inputs)
+
+    if mode not in ('forward', 'reverse'):
+        raise ValueError("mode must be either 'forward' or 'reverse'.")
+    return program
+
+
+class CompiledFunction():
+    '''
+    Callable returning (values, jacobian) for a traced function
+
+    The first call with an input of a given length traces func onto a tape and lowers it
+    to a straight-line NumPy program; later calls with the same length replay the program.
+    Every comparison seen while tracing becomes a guard: a program is only reused while
+    all of its guards hold, otherwise the next cached specialization is tried and, if none
+    matches, the function is retraced and the new specialization is cached as well.
+    Unless optimize=False, each trace goes through optimize before it is lowered; reports
+    holds its row counts, newest specialization first like programs and sources (None for
+    a specialization loaded from a file).
+    '''
+
+    def __init__(self, func, mode='reverse', optimize=True):
+        if mode not in ('forward', 'reverse'):
+            raise ValueError("mode must be either 'forward' or 'reverse'.")
+        self.func = func
+        self.mode = mode
+        self.programs = {}
+        self.sources = {}
+        self.reports = {}
+        self.optimize = optimize
+        self.retraces = 0
+
+    def __repr__(self):
+        return "{class_name}(func={func}, mode={mode})".format(class_name=type(self).__name__, func=getattr(self.func, '__name__', self.func), mode=self.mode)
+
+    def _trace(self, vals):
+        recording, n_inputs, outputs = trace(self.func, vals)
+        report = None
+        if self.optimize:
+            recording, outputs, report = optimize(recording, n_inputs, outputs)
+        return recording, n_inputs, outputs, report
+
+    def _compile(self, vals):
+        recording, n_inputs, outputs, report = self._trace(vals)
+        return self._install(recording, n_inputs, outputs, report=report)
+
+    def _install(self, recording, n_inputs, outputs, interpreted=False, report=None):
+        if interpreted:
+            source, program = None, interpret(recording, n_inputs, outputs, self.mode)
+        else:
+            source = lower(recording, n_inputs, outputs, self.mode)
+            width = len(outputs) if self.mode == 'reverse' else n_inputs
+            namespace = {'np': np, '_E': np.eye(width), '_Z': np.zeros(len(outputs) if self.mode == 'reverse' else n_inputs),
+                         '_GuardFailure': GuardFailure}
+            exec(compile(source, '<compiled {}>'.format(getattr(self.func, '__name__', 'function')), 'exec'), namespace)
+            program = namespace['_program']
+        #newest specialization first: it was traced for the branch the inputs most recently took
+        self.sources.setdefault(n_inputs, []).insert(0, source)
+        if self.optimize:
+            self.reports.setdefault(n_inputs, []).insert(0, report)
+        self.programs.setdefault(n_inputs, []).insert(0, program)
+        return program
+
+    def save(self, path, vals):
+        '''
+        Trace func at vals and write the (optimized) tape to path with serialize.save_trace
+        '''
+        recording, n_inputs, outputs, _ = self._trace(list(np.asarray(vals, dtype=float)))
+        serialize.save_trace(path, recording, n_inputs, outputs, self.func)
+
+    def load(self, path, interpreted=True):
+        '''
+        Add the specialization stored in path without tracing func
+
+        The file must have been saved from the same function source; its guards are checked
+        like those of a traced specialization, so other branches are still traced on demand.
+        By default the memory-mapped tape is replayed by interpret, which is ready at once;
+        interpreted=False lowers and compiles it instead (its source entry is then kept too).
+        '''
+        self._install(*serialize.load_trace(path, self.func), interpreted=interpreted)
+        return self
+
+    def _run(self, vals):
+        for program in self.programs.get(len(vals), ()):
+            try:
+                return program(vals)
+            except GuardFailure:
+                continue
+        if len(vals) in self.programs:
+            self.retraces += 1
+        return self._compile(vals)(vals)
+
+    def __call__(self, vals):
+        #np.float64 scalars, not Python floats, so 1 / 0 gives inf with a warning like the other engines
+        vals = list(np.asarray(vals, dtype=float))
+        values, jacob = self._run(vals)
+        #match ReverseAutoDiff.get_jacobian, which returns a flat gradient for single-output functions
+        if self.mode == 'reverse' and len(values) == 1:
+            jacob = jacob[0]
+        return values, jacob
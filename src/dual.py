@@ -1,9 +1,20 @@
 import numpy as np
+try:
+    from . import registry
+except ImportError:
+    import registry
 
+@registry.ufunc_methods
 class DualNumber:
     '''
     DualNumber class implementation for Automatic Differentiation
+
+    The dual part may be a scalar or a NumPy vector with one slot per seed
+    direction, in which case every operation propagates all directions at once.
     '''
+    __slots__ = ('real', 'dual')
+
+    __array_ufunc__ = registry.array_ufunc
 
     def __init__(self, real, dual=1):
         self.real = real
@@ -37,24 +48,32 @@ class DualNumber:
             return DualNumber(real= self.real / dual2, dual= self.dual / dual2) 
 
     def __pow__(self, n):
-        if isinstance(n, float) or isinstance(n, int):
-            n = DualNumber(n, 0)
-        
-        if self.real == 0:
-            return DualNumber(0, 0)
+        if isinstance(n, (int, float, np.number, np.ndarray)):
+            # constant exponent: power rule, which also stays finite for negative bases
+            # n x^(n-1) is exactly 0 for n = 0 and 1 for n = 1, also at x = 0 where the formula gives nan
+            if np.ndim(n) == 0 and n == 0:
+                return DualNumber(real=self.real ** 0, dual=0 * self.dual)
+            if np.ndim(n) == 0 and n == 1:
+                return DualNumber(real=self.real, dual=self.dual)
+            if not isinstance(self.real, (int, float, np.number, np.ndarray)):
+                # nested AD values (a DualNumber real for higher derivatives) use their own arithmetic
+                return DualNumber(real=self.real ** n, dual=n * self.real ** (n - 1) * self.dual)
+            # a zero base with a negative exponent gives inf like NumPy instead of raising
+            base = np.asarray(self.real, dtype=float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                real = base ** n
+                slope = np.where(n == 0, 0.0, np.where(n == 1, 1.0, n * base ** (n - 1)))
+            return DualNumber(real=real[()], dual=slope[()] * self.dual)
+
+        if np.all(self.real == 0):
+            return DualNumber(0, 0 * self.dual)
 
         try:
             real = self.real ** n.real
             dual = (self.real ** n.real) * (np.log(self.real) * n.dual + (self.dual * n.real) / self.real)
             return DualNumber(real=real, dual=dual)
-        except:
-            try: 
-                res = DualNumber(self.real, self.dual)
-                for _ in range(n.real):
-                    res *= self
-                return res
-            except AttributeError:
-                raise TypeError('Raising to an invalid power.')
+        except AttributeError:
+            raise TypeError('Raising to an invalid power.')
 
     def __radd__(self, dual2):
         return self.__add__(dual2)
@@ -68,13 +87,19 @@ class DualNumber:
     def __rtruediv__(self, dual2):
         return (self**-1) * (dual2)
 
+    def __rpow__(self, dual2):
+        # constant base: d(b^x) = b^x ln(b) dx
+        real = dual2 ** self.real
+        return DualNumber(real=real, dual=real * np.log(dual2) * self.dual)
+
     def __eq__(self, dual2):
+        # np.all so that vector-valued dual parts compare as a whole
         equal = False
         try:
-            if self.real == dual2.real and self.dual==dual2.dual:
+            if np.all(self.real == dual2.real) and np.all(self.dual == dual2.dual):
                 equal=True
         except AttributeError:
-            if self.dual == 0 and self.real == dual2:
+            if np.all(self.dual == 0) and np.all(self.real == dual2):
                 equal=True
         return equal
 
@@ -111,6 +136,373 @@ class DualNumber:
         except:
             return self.real >= dual2
 
+
+@registry.ufunc_methods
+class TaylorNumber:
+    '''
+    Truncated Taylor polynomial for higher-order forward mode
+
+    coeffs[k] is the k-th Taylor coefficient (the k-th derivative divided by k!) along
+    one direction, so a single pass propagates every derivative up to len(coeffs) - 1.
+    Products use direct truncated convolutions, which stay accurate when the coefficients span
+    hundreds of orders of magnitude; division, powers and the elementary functions use the
+    usual O(k^2) coefficient recurrences.
+    '''
+    __slots__ = ('coeffs',)
+
+    __array_ufunc__ = registry.array_ufunc
+
+    def __init__(self, coeffs):
+        self.coeffs = np.asarray(coeffs, dtype=float)
+
+    def __repr__(self):
+        return "{class_name}(coeffs={coeffs})".format(class_name=type(self).__name__, coeffs=self.coeffs)
+
+    @property
+    def real(self):
+        return self.coeffs[0]
+
+    @property
+    def order(self):
+        return len(self.coeffs) - 1
+
+    def _coerce(self, other):
+        # Plain numbers become constant polynomials of the same order
+        if isinstance(other, TaylorNumber):
+            return other
+        coeffs = np.zeros(len(self.coeffs))
+        coeffs[0] = other
+        return TaylorNumber(coeffs)
+
+    @staticmethod
+    def _convolve(a, b):
+        return np.convolve(a, b)[:len(a)]
+
+    def _integrate(self, value, h):
+        # Coefficients of g with g(0) = value and g' = h * u', where u is self
+        u = self.coeffs
+        g = np.empty(len(u))
+        g[0] = value
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = np.dot(j[1:k + 1] * u[1:k + 1], h[k - 1::-1]) / k
+        return TaylorNumber(g)
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        return TaylorNumber(self.coeffs + other.coeffs)
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        return TaylorNumber(self.coeffs - other.coeffs)
+
+    def __mul__(self, other):
+        if not isinstance(other, TaylorNumber):
+            return TaylorNumber(self.coeffs * other)
+        return TaylorNumber(self._convolve(self.coeffs, other.coeffs))
+
+    def __truediv__(self, other):
+        if not isinstance(other, TaylorNumber):
+            return TaylorNumber(self.coeffs / other)
+        a, b = self.coeffs, other.coeffs
+        q = np.empty(len(a))
+        for k in range(len(a)):
+            q[k] = (a[k] - np.dot(b[1:k + 1], q[k - 1::-1] if k else q[:0])) / b[0]
+        return TaylorNumber(q)
+
+    def __pow__(self, n):
+        if isinstance(n, TaylorNumber):
+            return (n * self.log()).exp()
+
+        u = self.coeffs
+        if u[0] == 0:
+            if float(n).is_integer() and n >= 0:
+                # Repeated squaring stays exact at a zero base
+                result, base, n = self._coerce(1), self, int(n)
+                while n:
+                    if n & 1:
+                        result = result * base
+                    base = base * base
+                    n >>= 1
+                return result
+            raise ValueError('Taylor expansion of a non-integer power at zero is undefined.')
+
+        g = np.empty(len(u))
+        g[0] = u[0] ** n
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = np.dot(((n + 1) * j[1:k + 1] - k) * u[1:k + 1], g[k - 1::-1]) / (k * u[0])
+        return TaylorNumber(g)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __rsub__(self, other):
+        return self._coerce(other) - self
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __rtruediv__(self, other):
+        return self._coerce(other) / self
+
+    def __rpow__(self, other):
+        return (self * np.log(other)).exp()
+
+    def __neg__(self):
+        return TaylorNumber(-self.coeffs)
+
+    def __pos__(self):
+        return TaylorNumber(self.coeffs.copy())
+
+    def __eq__(self, other):
+        try:
+            return bool(np.all(self.coeffs == other.coeffs))
+        except AttributeError:
+            return bool(np.all(self.coeffs[1:] == 0)) and self.coeffs[0] == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self.real < getattr(other, 'real', other)
+
+    def __le__(self, other):
+        return self.real <= getattr(other, 'real', other)
+
+    def __gt__(self, other):
+        return self.real > getattr(other, 'real', other)
+
+    def __ge__(self, other):
+        return self.real >= getattr(other, 'real', other)
+
+    # Coefficient recurrences used by elementary_functions
+
+    def exp(self):
+        u = self.coeffs
+        g = np.empty(len(u))
+        g[0] = np.exp(u[0])
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = np.dot(j[1:k + 1] * u[1:k + 1], g[k - 1::-1]) / k
+        return TaylorNumber(g)
+
+    def log(self):
+        u = self.coeffs
+        g = np.empty(len(u))
+        g[0] = np.log(u[0])
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = (u[k] - np.dot(j[1:k] * g[1:k], u[k - 1:0:-1]) / k) / u[0]
+        return TaylorNumber(g)
+
+    def sqrt(self):
+        u = self.coeffs
+        g = np.empty(len(u))
+        g[0] = np.sqrt(u[0])
+        for k in range(1, len(u)):
+            g[k] = (u[k] - np.dot(g[1:k], g[k - 1:0:-1])) / (2 * g[0])
+        return TaylorNumber(g)
+
+    def sin_cos(self, hyperbolic=False):
+        # s' = c u' and c' = -s u' (c' = s u' for the hyperbolic pair)
+        u = self.coeffs
+        s, c = np.empty(len(u)), np.empty(len(u))
+        s[0], c[0] = (np.sinh(u[0]), np.cosh(u[0])) if hyperbolic else (np.sin(u[0]), np.cos(u[0]))
+        sign = 1 if hyperbolic else -1
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            ju = j[1:k + 1] * u[1:k + 1]
+            s[k] = np.dot(ju, c[k - 1::-1]) / k
+            c[k] = sign * np.dot(ju, s[k - 1::-1]) / k
+        return TaylorNumber(s), TaylorNumber(c)
+
+    def _riccati(self, value, a, b):
+        # g' = (a + b g^2) u': tan is (1, 1), tanh is (1, -1)
+        u = self.coeffs
+        g, h = np.empty(len(u)), np.empty(len(u))
+        g[0] = value
+        h[0] = a + b * value ** 2
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = np.dot(j[1:k + 1] * u[1:k + 1], h[k - 1::-1]) / k
+            h[k] = b * np.dot(g[:k + 1], g[k::-1])
+        return TaylorNumber(g)
+
+    def tan(self):
+        return self._riccati(np.tan(self.real), 1, 1)
+
+    def tanh(self):
+        return self._riccati(np.tanh(self.real), 1, -1)
+
+    def logistic(self):
+        # g' = g (1 - g) u'
+        u = self.coeffs
+        g, h = np.empty(len(u)), np.empty(len(u))
+        g[0] = 1 / (1 + np.exp(-u[0]))
+        h[0] = g[0] - g[0] ** 2
+        j = np.arange(len(u))
+        for k in range(1, len(u)):
+            g[k] = np.dot(j[1:k + 1] * u[1:k + 1], h[k - 1::-1]) / k
+            h[k] = g[k] - np.dot(g[:k + 1], g[k::-1])
+        return TaylorNumber(g)
+
+    def arcsin(self):
+        return self._integrate(np.arcsin(self.real), (1 / (1 - self * self).sqrt()).coeffs)
+
+    def arccos(self):
+        return self._integrate(np.arccos(self.real), (-1 / (1 - self * self).sqrt()).coeffs)
+
+    def arctan(self):
+        return self._integrate(np.arctan(self.real), (1 / (1 + self * self)).coeffs)
+
+
+@registry.ufunc_methods
+class HyperDualNumber:
+    '''
+    Hyper-dual number real + eps1 e1 + eps2 e2 + eps12 e1 e2 with e1^2 = e2^2 = 0
+
+    Seeding eps1 and eps2 with the directions u and v leaves the first derivatives along
+    u and v in eps1 and eps2 and the exact second derivative u^T H v in eps12, with no
+    truncation or cancellation error. Like the dual part of DualNumber, each part may be
+    a NumPy vector holding one (u, v) pair per slot.
+    '''
+    __slots__ = ('real', 'eps1', 'eps2', 'eps12')
+
+    __array_ufunc__ = registry.array_ufunc
+
+    def __init__(self, real, eps1=0.0, eps2=0.0, eps12=0.0):
+        self.real = real
+        self.eps1 = eps1
+        self.eps2 = eps2
+        self.eps12 = eps12
+
+    def __repr__(self):
+        return "{class_name}(real={real}, eps1={eps1}, eps2={eps2}, eps12={eps12})".format(
+            class_name=type(self).__name__, real=self.real, eps1=self.eps1, eps2=self.eps2, eps12=self.eps12)
+
+    def _chain(self, value, first, second):
+        # f(self) from f, f' and f'' at the real part
+        return HyperDualNumber(value, first * self.eps1, first * self.eps2, first * self.eps12 + second * self.eps1 * self.eps2)
+
+    def _exp(self):
+        value = np.exp(self.real)
+        return self._chain(value, value, value)
+
+    def _log(self):
+        return self._chain(np.log(self.real), 1 / self.real, -1 / self.real ** 2)
+
+    def __add__(self, other):
+        if isinstance(other, HyperDualNumber):
+            return HyperDualNumber(self.real + other.real, self.eps1 + other.eps1, self.eps2 + other.eps2, self.eps12 + other.eps12)
+        return HyperDualNumber(self.real + other, self.eps1, self.eps2, self.eps12)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        if isinstance(other, HyperDualNumber):
+            return HyperDualNumber(self.real * other.real,
+                                   self.real * other.eps1 + self.eps1 * other.real,
+                                   self.real * other.eps2 + self.eps2 * other.real,
+                                   self.real * other.eps12 + self.eps1 * other.eps2 + self.eps2 * other.eps1 + self.eps12 * other.real)
+        return HyperDualNumber(self.real * other, self.eps1 * other, self.eps2 * other, self.eps12 * other)
+
+    def __truediv__(self, other):
+        if isinstance(other, HyperDualNumber):
+            return self * other ** -1
+        return HyperDualNumber(self.real / other, self.eps1 / other, self.eps2 / other, self.eps12 / other)
+
+    def __pow__(self, n):
+        if isinstance(n, HyperDualNumber):
+            return (n * self._log())._exp()
+        # constant exponent: power rule, the n = 0 and n = 1 terms dropped so x ** 1 stays finite at 0;
+        # other powers of a zero base give inf or nan like DualNumber instead of raising
+        base = np.asarray(self.real, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = base ** n
+            first = np.where(n == 0, 0.0, n * base ** (n - 1))
+            second = np.where(n * (n - 1) == 0, 0.0, n * (n - 1) * base ** (n - 2))
+        return self._chain(value[()], first[()], second[()])
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __rtruediv__(self, other):
+        return self ** -1 * other
+
+    def __rpow__(self, other):
+        # constant base: b^x = exp(x ln b)
+        value, log_base = other ** self.real, np.log(other)
+        return self._chain(value, value * log_base, value * log_base ** 2)
+
+    def __neg__(self):
+        return HyperDualNumber(-self.real, -self.eps1, -self.eps2, -self.eps12)
+
+    def __pos__(self):
+        return HyperDualNumber(self.real, self.eps1, self.eps2, self.eps12)
+
+    def __eq__(self, other):
+        if isinstance(other, HyperDualNumber):
+            return bool(np.all(self.real == other.real) and np.all(self.eps1 == other.eps1)
+                        and np.all(self.eps2 == other.eps2) and np.all(self.eps12 == other.eps12))
+        return bool(np.all(self.real == other) and np.all(self.eps1 == 0) and np.all(self.eps2 == 0) and np.all(self.eps12 == 0))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    #comparisons look at the real part only, like DualNumber
+    def __lt__(self, other):
+        return self.real < getattr(other, 'real', other)
+
+    def __le__(self, other):
+        return self.real <= getattr(other, 'real', other)
+
+    def __gt__(self, other):
+        return self.real > getattr(other, 'real', other)
+
+    def __ge__(self, other):
+        return self.real >= getattr(other, 'real', other)
+
+# Rule handlers for the elementary functions, see registry
+
+@registry.register_handler(DualNumber)
+def _dual_rule(primitive):
+    value, derivative = primitive.value, primitive.derivative
+    def rule(x, *args):
+        real = value(x.real, *args)
+        return DualNumber(real, x.dual * derivative(x.real, real, *args))
+    return rule
+
+@registry.register_handler(TaylorNumber)
+def _taylor_rule(primitive):
+    return primitive.taylor
+
+@registry.register_handler(HyperDualNumber)
+def _hyperdual_rule(primitive):
+    # f'' comes from running the derivative rule itself on a DualNumber seeded at the real part
+    value, derivative = primitive.value, primitive.derivative
+    def rule(x, *args):
+        real = value(x.real, *args)
+        first = derivative(x.real, real, *args)
+        second = derivative(DualNumber(x.real, 1.0), DualNumber(real, first), *args).dual
+        return x._chain(real, first, second)
+    return rule
+
+@registry.register_handler(object)
+def _constant_rule(primitive):
+    # Plain numbers become DualNumbers holding the value, as the elementary functions always returned
+    value = primitive.value
+    def rule(x, *args):
+        return DualNumber(value(x, *args))
+    return rule
+
 if __name__ == '__main__':
     d = DualNumber(0,1)
     print(d**120)
\ No newline at end of file
@@ -0,0 +1,26 @@
+#graph traversal shared by the ReverseNode and TensorNode engines
+
+
+def topological_order(roots, children):
+    '''
+    Nodes reachable from roots, each after all of its children
+
+    children(node) returns the inputs of node (None entries are skipped). The search is an
+    iterative depth-first search, so deep chains never hit the recursion limit, and nodes
+    shared between several parents are visited once.
+    '''
+    order, visited = [], set()
+    pending = [(node, False) for node in reversed(roots)]
+    while pending:
+        node, expanded = pending.pop()
+        if expanded:
+            order.append(node)
+            continue
+        if id(node) in visited:
+            continue
+        visited.add(id(node))
+        pending.append((node, True))
+        for child in children(node):
+            if child is not None and id(child) not in visited:
+                pending.append((child, False))
+    return order
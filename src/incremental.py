@@ -0,0 +1,137 @@
+#incremental re-evaluation of a traced function when only some inputs change
+#the tape of the last call is kept together with its consumer lists; a new input only recomputes
+#the rows downstream of the entries that changed and re-sweeps the adjoints those rows affect
+import heapq
+import numpy as np
+try:
+    from .compiler import VALUE_FUNCTIONS, PARTIAL_FUNCTIONS, _COMPARISONS, trace
+except ImportError:
+    from compiler import VALUE_FUNCTIONS, PARTIAL_FUNCTIONS, _COMPARISONS, trace
+
+
+class IncrementalTape():
+    '''
+    Values and Jacobian of func, updated from the previous call instead of recomputed
+
+    The first call traces func onto a tape and sweeps every row. Later calls with an input
+    of the same length mark the rows downstream of the changed entries dirty and recompute
+    their values and local partials in tape order; a row whose value comes out unchanged
+    does not dirty its consumers. Adjoints are then re-accumulated, from the consumer lists,
+    only for the rows above a changed partial or a changed adjoint. A flipped guard or a new
+    input length traces func again. touched and swept count the rows recomputed by the last
+    call in each direction.
+    '''
+
+    def __init__(self, func):
+        self.func = func
+        self.n_inputs = None
+        self.touched = 0
+        self.swept = 0
+        self.retraces = 0
+
+    def __repr__(self):
+        return "{class_name}(func={func}, n_inputs={n_inputs})".format(
+            class_name=type(self).__name__, func=getattr(self.func, '__name__', self.func), n_inputs=self.n_inputs)
+
+    def _trace(self, vals):
+        recording, n_inputs, outputs = trace(self.func, vals)
+        n = recording.size
+        self.n_inputs, self.outputs = n_inputs, outputs
+        self.ops = recording.ops[:n].tolist()
+        self.parents = recording.parents[:n].tolist()
+        self.partials = recording.partials[:n].tolist()
+        self.values = recording.values[:n].tolist()
+        self.consts = recording.consts[:n].tolist()
+        self.consumers = [[] for _ in range(n)]
+        for i, parents in enumerate(self.parents):
+            for slot, p in enumerate(parents):
+                if p >= 0:
+                    self.consumers[p].append((i, slot))
+        self.guards = {}
+        for guard in recording.guards:
+            _, row, other, _, _ = guard
+            self.guards.setdefault(row, []).append(guard)
+            if other >= 0:
+                self.guards.setdefault(other, []).append(guard)
+        #adjoint of every row with respect to every output, pulled from the consumers in the same
+        #order _update uses, so an adjoint recomputed from unchanged inputs compares equal
+        self.seeds = np.zeros((n, len(outputs)))
+        for k, (kind, row) in enumerate(outputs):
+            if kind == 'node':
+                self.seeds[row, k] += 1
+        self.adjoints = self.seeds.copy()
+        for i in range(n - 1, -1, -1):
+            for consumer, slot in self.consumers[i]:
+                self.adjoints[i] += self.adjoints[consumer] * self.partials[consumer][slot]
+        self.touched = self.swept = n
+
+    def _update(self, vals):
+        #returns False when a guard flips and the tape no longer describes func at vals
+        values, parents, partials, consts, ops = self.values, self.parents, self.partials, self.consts, self.ops
+        pending, changed, resweep = [], [], []
+        for i in range(self.n_inputs):
+            if vals[i] != values[i]:
+                values[i] = vals[i]
+                changed.append(i)
+                pending.extend(c for c, _ in self.consumers[i])
+        heapq.heapify(pending)
+        touched, last = 0, -1
+        while pending:
+            i = heapq.heappop(pending)
+            if i == last:
+                continue
+            last = i
+            touched += 1
+            p0, p1 = parents[i]
+            a, b, c = values[p0], values[p1] if p1 >= 0 else 0.0, consts[i]
+            v = VALUE_FUNCTIONS[ops[i]](a, b, c)
+            for slot, partial in enumerate(PARTIAL_FUNCTIONS[ops[i]]):
+                d = partial(a, b, c, v)
+                if d != partials[i][slot]:
+                    partials[i][slot] = d
+                    resweep.append(-parents[i][slot])
+            if v != values[i]:
+                values[i] = v
+                changed.append(i)
+                for consumer, _ in self.consumers[i]:
+                    heapq.heappush(pending, consumer)
+        self.touched = touched
+
+        for i in changed:
+            for op, row, other, const, outcome in self.guards.get(i, ()):
+                if bool(_COMPARISONS[op](values[row], values[other] if other >= 0 else const)) != outcome:
+                    return False
+
+        #pull adjoints from the consumers, highest row first, so every consumer is final when it is read
+        adjoints, seeds = self.adjoints, self.seeds
+        heapq.heapify(resweep)
+        swept, last = 0, None
+        while resweep:
+            i = -heapq.heappop(resweep)
+            if i == last:
+                continue
+            last = i
+            swept += 1
+            adjoint = seeds[i].copy()
+            for consumer, slot in self.consumers[i]:
+                adjoint += adjoints[consumer] * partials[consumer][slot]
+            if not np.array_equal(adjoint, adjoints[i]):
+                adjoints[i] = adjoint
+                for p in parents[i]:
+                    if p >= 0:
+                        heapq.heappush(resweep, -p)
+        self.swept = swept
+        return True
+
+    def evaluate(self, vals):
+        '''
+        (values, jacobian) of func at vals, the Jacobian always (m, n)
+        '''
+        vals = np.asarray(vals, dtype=float).tolist()
+        if len(vals) != self.n_inputs:
+            self._trace(vals)
+        elif not self._update(vals):
+            self.retraces += 1
+            self._trace(vals)
+        values = np.array([self.values[row] if kind == 'node' else row for kind, row in self.outputs], dtype=float)
+        return values, self.adjoints[:self.n_inputs].T.copy()
@@ -0,0 +1,78 @@
+#shared-memory transport for multi-process batch differentiation
+#inputs and preallocated outputs live in multiprocessing.shared_memory blocks; only their
+#names, shapes and the row offsets of each work item cross the process pool's pipe
+import sys
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+
+def _tracker_pid():
+    #pid of the resource tracker this process launched or inherited by fork; None when it
+    #only inherited the connection to its parent's tracker (spawn and forkserver workers)
+    resource_tracker.ensure_running()
+    return resource_tracker._resource_tracker._pid
+
+
+def create_shared(shape, dtype=float):
+    '''
+    Allocate a zero-filled shared-memory array
+
+    Returns the SharedMemory block (the caller closes and unlinks it), the array viewing it
+    and the picklable spec a worker passes to attach_shared.
+    '''
+    dtype = np.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    array[...] = 0
+    return block, array, (block.name, tuple(shape), dtype.str, _tracker_pid())
+
+
+def attach_shared(spec):
+    '''
+    Map an existing shared-memory array from its spec; the caller closes the returned block
+
+    The segment belongs to the process that created it. A worker with a resource tracker of its
+    own must not register it there, or that tracker would unlink it (and warn) when the worker exits.
+    '''
+    name, shape, dtype, tracker = spec
+    if sys.version_info >= (3, 13):
+        block = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        block = shared_memory.SharedMemory(name=name)
+        #only a worker forked before the creator's tracker started has launched a tracker of its own
+        own_tracker = _tracker_pid()
+        if own_tracker is not None and own_tracker != tracker:
+            resource_tracker.unregister(block._name, 'shared_memory')
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def run_shared_rows(executor, worker, X, n_outputs, starts, stops, *args):
+    '''
+    Run worker over row blocks of X with all arrays in shared memory
+
+    worker(x_spec, vals_spec, jacob_spec, start, stop, *args) must write rows [start, stop)
+    of the (N, m) values and (N, m, n) Jacobian in place. Returns copies of both outputs.
+    '''
+    X = np.ascontiguousarray(X, dtype=float)
+    N, n = X.shape
+    blocks = []
+    x_shared = vals = jacob = None
+    try:
+        x_block, x_shared, x_spec = create_shared(X.shape)
+        blocks.append(x_block)
+        x_shared[...] = X
+        vals_block, vals, vals_spec = create_shared((N, n_outputs))
+        blocks.append(vals_block)
+        jacob_block, jacob, jacob_spec = create_shared((N, n_outputs, n))
+        blocks.append(jacob_block)
+
+        n_blocks = len(starts)
+        list(executor.map(worker, [x_spec] * n_blocks, [vals_spec] * n_blocks, [jacob_spec] * n_blocks, starts, stops,
+                          *[[arg] * n_blocks for arg in args]))
+        return vals.copy(), jacob.copy()
+    finally:
+        #drop our views before closing, then free the segments
+        x_shared = vals = jacob = None
+        for block in blocks:
+            block.close()
+            block.unlink()
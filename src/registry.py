@@ -0,0 +1,136 @@
+#single table of derivative rules for the elementary functions, with O(1) dispatch on the argument type
+#every AD type registers one handler that specializes a rule to its own representation, and routes
+#NumPy ufunc calls (np.sin(x), np.float64(2) * x, ...) through array_ufunc
+from collections import namedtuple
+import operator
+import numpy as np
+
+#value(x, *args) is the function on plain numbers, derivative(x, value, *args) its derivative;
+#both use only NumPy ufuncs and arithmetic, so they also work on nested AD values (e.g. the
+#DualNumber values of a ReverseNode during forward-over-reverse)
+#taylor(t, *args) applies the primitive to a TaylorNumber through its coefficient recurrences
+Primitive = namedtuple('Primitive', ('name', 'value', 'derivative', 'taylor'))
+
+PRIMITIVES = {}
+#type -> handler(primitive) returning the specialized rule(x, *args) for that type
+HANDLERS = {}
+#primitive name -> {type: specialized rule}, filled on first use
+RULES = {}
+UFUNCS = {}
+
+
+def define(name, value, derivative, taylor, ufunc=None):
+    PRIMITIVES[name] = primitive = Primitive(name, value, derivative, taylor)
+    RULES[name] = {}
+    if ufunc is not None:
+        UFUNCS[ufunc] = (primitive, ())
+    return primitive
+
+
+def register_handler(cls):
+    '''
+    Decorator registering handler(primitive) -> rule(x, *args) for arguments of type cls
+    '''
+    def decorator(handler):
+        HANDLERS[cls] = handler
+        for rules in RULES.values():
+            rules.clear()
+        return handler
+    return decorator
+
+
+def rule(primitive, cls):
+    # Specialize on first use; subclasses resolve to the nearest registered base in the MRO
+    rules = RULES[primitive.name]
+    try:
+        return rules[cls]
+    except KeyError:
+        for base in cls.__mro__:
+            if base in HANDLERS:
+                rules[cls] = HANDLERS[base](primitive)
+                return rules[cls]
+
+
+def apply(primitive, x, *args):
+    return rule(primitive, type(x))(x, *args)
+
+
+#arithmetic and comparison ufuncs map to the operators of the AD type, reflected when it is the right operand
+_UNARY = {np.negative: operator.neg, np.positive: operator.pos}
+_BINARY = {
+    np.add: ('__add__', '__radd__'), np.subtract: ('__sub__', '__rsub__'), np.multiply: ('__mul__', '__rmul__'),
+    np.true_divide: ('__truediv__', '__rtruediv__'), np.power: ('__pow__', '__rpow__'),
+    np.matmul: ('__matmul__', '__rmatmul__'),
+    np.equal: ('__eq__', '__eq__'), np.not_equal: ('__ne__', '__ne__'), np.less: ('__lt__', '__gt__'),
+    np.less_equal: ('__le__', '__ge__'), np.greater: ('__gt__', '__lt__'), np.greater_equal: ('__ge__', '__le__'),
+}
+
+
+def array_ufunc(self, ufunc, method, *inputs, **kwargs):
+    '''
+    __array_ufunc__ shared by the AD types
+
+    It makes NumPy calls on AD values, such as np.sin(x), np.float64(2) * x or W @ x with an
+    ndarray W, dispatch to the AD rules. Elementary ufuncs go through the registry and
+    arithmetic ufuncs call the type's own operators; anything else (reductions, out=,
+    unsupported ufuncs) is left to NumPy to reject.
+    '''
+    if method != '__call__' or kwargs:
+        return NotImplemented
+    if ufunc in UFUNCS:
+        primitive, args = UFUNCS[ufunc]
+        return apply(primitive, inputs[0], *args)
+    if ufunc in _UNARY:
+        return _UNARY[ufunc](inputs[0])
+    if ufunc in _BINARY:
+        forward, reflected = _BINARY[ufunc]
+        a, b = inputs
+        if a is self:
+            return getattr(a, forward)(b)
+        return getattr(b, reflected)(a)
+    return NotImplemented
+
+
+def ufunc_methods(cls):
+    '''
+    Class decorator giving an AD type one method per elementary ufunc (x.sin(), x.log10(), ...)
+
+    A ufunc applied to an object array calls the method of that name on every element, so
+    np.sin(np.array([x0, x1])) differentiates like [sin(x0), sin(x1)]. Methods the type
+    already defines (TaylorNumber's coefficient recurrences) are kept.
+    '''
+    for ufunc, (primitive, args) in UFUNCS.items():
+        if not hasattr(cls, ufunc.__name__):
+            setattr(cls, ufunc.__name__, lambda self, primitive=primitive, args=args: apply(primitive, self, *args))
+    return cls
+
+
+def _log_value(x, b=np.e):
+    return np.log(x) / np.log(b)
+
+
+def _log_derivative(x, value, b=np.e):
+    return 1 / (x * np.log(b))
+
+
+def _logistic_value(x):
+    return 1 / (1 + np.exp(-x))
+
+
+define('sin', np.sin, lambda x, v: np.cos(x), lambda t: t.sin_cos()[0], np.sin)
+define('cos', np.cos, lambda x, v: -np.sin(x), lambda t: t.sin_cos()[1], np.cos)
+define('tan', np.tan, lambda x, v: 1 / np.cos(x) ** 2, lambda t: t.tan(), np.tan)
+define('exp', np.exp, lambda x, v: v, lambda t: t.exp(), np.exp)
+define('arcsin', np.arcsin, lambda x, v: 1 / np.sqrt(1 - x ** 2), lambda t: t.arcsin(), np.arcsin)
+define('arccos', np.arccos, lambda x, v: -1 / np.sqrt(1 - x ** 2), lambda t: t.arccos(), np.arccos)
+define('arctan', np.arctan, lambda x, v: 1 / (1 + x ** 2), lambda t: t.arctan(), np.arctan)
+define('sinh', np.sinh, lambda x, v: np.cosh(x), lambda t: t.sin_cos(hyperbolic=True)[0], np.sinh)
+define('cosh', np.cosh, lambda x, v: np.sinh(x), lambda t: t.sin_cos(hyperbolic=True)[1], np.cosh)
+define('tanh', np.tanh, lambda x, v: 1 / np.cosh(x) ** 2, lambda t: t.tanh(), np.tanh)
+define('logistic', _logistic_value, lambda x, v: v * (1 - v), lambda t: t.logistic())
+define('sqrt', np.sqrt, lambda x, v: 0.5 / v, lambda t: t.sqrt(), np.sqrt)
+define('log', _log_value, _log_derivative, lambda t, b=np.e: t.log() / np.log(b))
+#the base is always passed explicitly so the tape can store it as the op constant
+UFUNCS[np.log] = (PRIMITIVES['log'], (np.e,))
+UFUNCS[np.log2] = (PRIMITIVES['log'], (2,))
+UFUNCS[np.log10] = (PRIMITIVES['log'], (10,))
@@ -1,25 +1,70 @@
 #this file will import ad elements from the ad object and implement reverse ad
 import numpy as np
+try:
+    from . import registry
+except ImportError:
+    import registry
 
+
+@registry.ufunc_methods
 class ReverseNode():
+    #fixed layout for ops of arity one and two: no per-instance __dict__ and no lists
+    #child1/gradient1 stay None for unary ops, both children stay None for root nodes
+    #adjoint is filled in by the backward sweep instead of a dict keyed by node identity
+    __slots__ = ('val', 'child0', 'child1', 'gradient0', 'gradient1', 'adjoint', '__weakref__')
+
+    __array_ufunc__ = registry.array_ufunc
+
     def __init__(self, val, gradient=None):
         self.val = val
-        self.child_pointers = []
-        self.gradient = gradient #we populate this on the second pass
+        self.child0 = self.child1 = None
+        self.gradient0 = self.gradient1 = None
+        self.adjoint = None
+        if gradient is not None:
+            self.gradient = gradient #we populate this on the second pass
+
+    @staticmethod
+    def unary(val, child, gradient):
+        a = ReverseNode(val)
+        a.child0 = child
+        a.gradient0 = gradient
+        return a
+
+    @staticmethod
+    def binary(val, child0, child1, gradient0, gradient1):
+        a = ReverseNode(val)
+        a.child0, a.child1 = child0, child1
+        a.gradient0, a.gradient1 = gradient0, gradient1
+        return a
+
+    #list views kept for callers written against the original layout
+    @property
+    def child_pointers(self):
+        return [child for child in (self.child0, self.child1) if child is not None]
+
+    @child_pointers.setter
+    def child_pointers(self, children):
+        children = list(children) + [None, None]
+        self.child0, self.child1 = children[0], children[1]
+
+    @property
+    def gradient(self):
+        if self.gradient0 is None:
+            return None
+        return [grad for grad in (self.gradient0, self.gradient1) if grad is not None]
+
+    @gradient.setter
+    def gradient(self, gradient):
+        gradient = list(gradient) + [None, None]
+        self.gradient0, self.gradient1 = gradient[0], gradient[1]
     
     def __add__(self, arg):
         try: 
             val = self.val + arg.val
-            gradient = [1,1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, 1, 1)
         except:
             val = self.val + arg
-            gradient = [1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, 1)
     
     def __radd__(self, arg):
         return self.__add__(arg)
@@ -27,16 +72,10 @@ class ReverseNode():
     def __mul__(self, arg):
         try:
             val = self.val * arg.val
-            gradient = [arg.val, self.val]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, arg.val, self.val)
         except:
             val = self.val * arg
-            gradient = [arg]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, arg)
 
     def __rmul__(self, arg):
         return self.__mul__(arg)
@@ -44,72 +83,46 @@ class ReverseNode():
     def __sub__(self, arg):
         try:
             val = self.val - arg.val
-            gradient = [1, -1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, 1, -1)
         except:
             val = self.val - arg
-            gradient = [1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, 1)
     
     def __rsub__(self, arg):
         try:
             val = -1 * self.val + arg.val
-            gradient = [-1, 1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, -1, 1)
         except:
             val = -1 * self.val + arg
-            gradient = [-1]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, -1)
 
     def __truediv__(self, arg):
         try:
             val = self.val / arg.val
-            gradient = [1/arg.val, -(self.val/arg.val**2)]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, 1/arg.val, -(self.val/arg.val**2))
         except: 
             val = self.val / arg
-            gradient = [1/arg]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, 1/arg)
 
     def __rtruediv__(self, arg):
         try:
             val = arg.val / self.val
-            gradient = [-(arg.val/self.val**2), 1/self.val] 
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, -(arg.val/self.val**2), 1/self.val)
         except: 
             val = arg / self.val
-            gradient = [-(arg/self.val**2)]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, -(arg/self.val**2))
 
     def __pow__(self, arg):
         try: 
             val = self.val ** arg.val
-            gradient = [arg.val * self.val ** (arg.val - 1), (self.val ** arg.val) * np.log(self.val)]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self, arg]
-            return a
+            return ReverseNode.binary(val, self, arg, arg.val * self.val ** (arg.val - 1), (self.val ** arg.val) * np.log(self.val))
         except: 
             val = self.val ** arg
-            gradient = [arg * self.val ** (arg - 1)]
-            a = ReverseNode(val, gradient)
-            a.child_pointers = [self]
-            return a
+            return ReverseNode.unary(val, self, arg * self.val ** (arg - 1))
+
+    def __rpow__(self, arg):
+        val = arg ** self.val
+        return ReverseNode.unary(val, self, val * np.log(arg))
     
     def __eq__(self, arg):
         try: 
@@ -122,17 +135,11 @@ class ReverseNode():
 
     def __neg__(self):
         val = -1 * self.val
-        gradient = [-1, self.val]
-        a = ReverseNode(val, gradient)
-        a.child_pointers = [self]
-        return a
+        return ReverseNode.unary(val, self, -1)
 
     def __pos__(self):
         val = self.val
-        gradient = [1, self.val]
-        a = ReverseNode(val, gradient)
-        a.child_pointers = [self]
-        return a
+        return ReverseNode.unary(val, self, 1)
 
     def __lt__(self, arg):
         try: 
@@ -162,6 +169,17 @@ class ReverseNode():
         return "{class_name}(val={val}, child_pointers={child_pointers}, gradient={grads})".format(class_name=type(self), val=self.val, child_pointers=self.child_pointers, grads=self.gradient)
 
 
+#node values may themselves be AD numbers (forward-over-reverse); the registry rules are written
+#with NumPy ufuncs, so they dispatch on the value type in turn
+@registry.register_handler(ReverseNode)
+def _reverse_rule(primitive):
+    value, derivative = primitive.value, primitive.derivative
+    def rule(x, *args):
+        val = value(x.val, *args)
+        return ReverseNode.unary(val, x, derivative(x.val, val, *args))
+    return rule
+
+
 if __name__ == "__main__":
     x = ReverseNode(2)
     y = ReverseNode(3)
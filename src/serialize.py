@@ -0,0 +1,123 @@
+#versioned binary files for traced tapes
+#a file holds the op codes, parent indices and constants of one trace as flat arrays after a fixed
+#header, each section 64-byte aligned so loading is a set of read-only np.memmap views of the file
+import hashlib
+import inspect
+import struct
+import numpy as np
+try:
+    from . import tape
+except ImportError:
+    import tape
+
+MAGIC = b'ADTRACE\x00'
+FORMAT_VERSION = 1
+
+#magic, version, n_inputs, n_rows, n_outputs, n_guards, sha256 of the function source
+_HEADER = struct.Struct('<8sIIQQQ32s')
+_HEADER_SIZE = 128
+_ALIGN = 64
+
+#guard comparisons are stored as their index in this tuple
+_GUARD_OPS = ('==', '!=', '<', '<=', '>', '>=')
+
+
+def source_checksum(func):
+    '''
+    SHA-256 digest of the source of func (of its bytecode and constants if the source is unavailable)
+    '''
+    try:
+        text = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        code = getattr(func, '__code__', None) or func.__call__.__code__
+        text = code.co_code + repr(code.co_consts).encode()
+    return hashlib.sha256(text).digest()
+
+
+def _sections(n_rows, n_outputs, n_guards):
+    #(name, dtype, shape) in file order
+    return (('ops', np.int16, (n_rows,)), ('parents', np.int64, (n_rows, 2)), ('consts', np.float64, (n_rows,)),
+            ('output_rows', np.int64, (n_outputs,)), ('output_consts', np.float64, (n_outputs,)),
+            ('guard_ints', np.int64, (n_guards, 4)), ('guard_consts', np.float64, (n_guards,)))
+
+
+def _layout(sections):
+    #byte offset of each section and the padded end of the file
+    layout, offset = [], _HEADER_SIZE
+    for name, dtype, shape in sections:
+        layout.append((name, dtype, shape, offset))
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // _ALIGN) * _ALIGN
+    return layout, offset
+
+
+def save_trace(path, recording, n_inputs, outputs, func):
+    '''
+    Write a traced tape, its outputs and guards to path
+
+    Only what a replay needs is stored: op codes, parent indices and op constants per row,
+    the output specs and the guards. The header records the format version and the
+    checksum of func, which load_trace checks against the function it is given.
+    '''
+    n = recording.size
+    arrays = {
+        'ops': recording.ops[:n], 'parents': recording.parents[:n], 'consts': recording.consts[:n],
+        'output_rows': np.array([row if kind == 'node' else -1 for kind, row in outputs], dtype=np.int64),
+        'output_consts': np.array([row if kind == 'const' else 0.0 for kind, row in outputs], dtype=float),
+        'guard_ints': np.array([(_GUARD_OPS.index(op), row, other, outcome) for op, row, other, _, outcome in recording.guards],
+                               dtype=np.int64).reshape(-1, 4),
+        'guard_consts': np.array([const for _, _, _, const, _ in recording.guards], dtype=float),
+    }
+    layout, end = _layout(_sections(n, len(outputs), len(recording.guards)))
+    with open(path, 'wb') as file:
+        file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, n_inputs, n, len(outputs), len(recording.guards),
+                                source_checksum(func)).ljust(_HEADER_SIZE, b'\x00'))
+        for name, dtype, shape, offset in layout:
+            file.seek(offset)
+            file.write(np.ascontiguousarray(arrays[name], dtype=np.dtype(dtype).newbyteorder('<')).tobytes())
+        file.truncate(end)
+
+
+def read_header(path):
+    '''
+    (version, n_inputs, n_rows, n_outputs, n_guards, checksum) of a trace file
+    '''
+    with open(path, 'rb') as file:
+        raw = file.read(_HEADER.size)
+    if len(raw) < _HEADER.size or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError('{} is not a trace file.'.format(path))
+    magic, *header = _HEADER.unpack(raw)
+    if header[0] != FORMAT_VERSION:
+        raise ValueError('Trace file version {} is not supported (expected {}).'.format(header[0], FORMAT_VERSION))
+    return tuple(header)
+
+
+def load_trace(path, func=None):
+    '''
+    Map a trace file written by save_trace; returns (tape, n_inputs, outputs)
+
+    The tape's ops, parents and consts are read-only np.memmap views of the file, which
+    lower and interpret read one block of rows at a time, keeping only the live rows in
+    the program they build. It carries no values or partials: it is meant to be lowered,
+    not swept. When func is given, a file traced from different source raises ValueError.
+    '''
+    version, n_inputs, n_rows, n_outputs, n_guards, checksum = read_header(path)
+    if func is not None and checksum != source_checksum(func):
+        raise ValueError('{} was traced from a different function.'.format(path))
+    arrays = {}
+    for name, dtype, shape, offset in _layout(_sections(n_rows, n_outputs, n_guards))[0]:
+        dtype = np.dtype(dtype).newbyteorder('<')
+        if 0 in shape:
+            #np.memmap cannot map zero bytes
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+    recording = tape.Tape(capacity=1)
+    recording.ops, recording.parents, recording.consts = arrays['ops'], arrays['parents'], arrays['consts']
+    recording.values = recording.partials = None
+    recording.size = n_rows
+    recording.guards = [(_GUARD_OPS[op], row, other, const, bool(outcome))
+                        for (op, row, other, outcome), const in zip(arrays['guard_ints'].tolist(), arrays['guard_consts'].tolist())]
+    outputs = [('node', row) if row >= 0 else ('const', const)
+               for row, const in zip(arrays['output_rows'].tolist(), arrays['output_consts'].tolist())]
+    return recording, n_inputs, outputs
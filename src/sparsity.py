@@ -0,0 +1,65 @@
+#sparsity pattern detection and column coloring for compressed Jacobians
+import numpy as np
+from scipy import sparse
+try:
+    from .compiler import trace
+except ImportError:
+    from compiler import trace
+
+
+def jacobian_sparsity(func, vals):
+    '''
+    Structural sparsity pattern of the Jacobian of func at vals
+
+    The function is recorded once onto a tape and the set of inputs each row depends on
+    is propagated forwards. Returns an (m, n) scipy.sparse CSR matrix of ones.
+    '''
+    recording, n_inputs, outputs = trace(func, vals)
+    parents = recording.parents[:recording.size].tolist()
+    deps = [frozenset((i,)) for i in range(n_inputs)]
+    for p0, p1 in parents[n_inputs:]:
+        if p1 >= 0:
+            deps.append(deps[p0] | deps[p1])
+        else:
+            deps.append(deps[p0])
+
+    rows, cols = [], []
+    for i, (kind, row) in enumerate(outputs):
+        if kind == 'node':
+            cols.extend(sorted(deps[row]))
+            rows.extend([i] * len(deps[row]))
+    data = np.ones(len(rows))
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(outputs), n_inputs))
+
+
+def color_columns(pattern):
+    '''
+    Greedy distance-2 coloring of the columns of a sparsity pattern
+
+    Two columns get different colors whenever they share a nonzero row, so all columns of
+    one color are structurally orthogonal and can be seeded together. Columns are colored
+    in order of decreasing nonzero count. Returns (colors, number of colors).
+    '''
+    pattern = sparse.csr_matrix(pattern)
+    by_column = pattern.tocsc()
+    n = pattern.shape[1]
+    colors = np.full(n, -1, dtype=np.int64)
+    degree = np.diff(by_column.indptr)
+    for j in np.argsort(-degree, kind='stable'):
+        forbidden = set()
+        for i in by_column.indices[by_column.indptr[j]:by_column.indptr[j + 1]]:
+            forbidden.update(colors[pattern.indices[pattern.indptr[i]:pattern.indptr[i + 1]]].tolist())
+        color = 0
+        while color in forbidden:
+            color += 1
+        colors[j] = color
+    return colors, int(colors.max()) + 1 if n else 0
+
+
+def decompress(compressed, pattern, colors):
+    '''
+    Recover the sparse Jacobian from its compressed (m, number of colors) form
+    '''
+    pattern = sparse.coo_matrix(pattern)
+    data = compressed[pattern.row, colors[pattern.col]]
+    return sparse.csr_matrix((data, (pattern.row, pattern.col)), shape=pattern.shape)
@@ -0,0 +1,83 @@
+#streaming gradient accumulation for losses that are sums over a stream of data chunks
+#each chunk is differentiated on its own and its graph is released before the next chunk is
+#pulled, so peak memory follows the chunk size instead of the dataset size
+import queue
+import threading
+import numpy as np
+try:
+    from .ad import ReverseAutoDiff
+except ImportError:
+    from ad import ReverseAutoDiff
+
+_DONE = object()
+
+
+def _prefetched(chunks, depth):
+    #pull chunks on a background thread into a bounded queue; errors are re-raised in the consumer
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        #block until there is room or the consumer has stopped; False once it has
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+            put(_DONE)
+        except BaseException as error:
+            put(error)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        #let the producer finish if the consumer stops early
+        stop.set()
+
+
+def streaming_gradient(loss, params, chunks, mode='graph', prefetch=0):
+    '''
+    Value and gradient of sum_k loss(params, chunk_k) over an iterable of data chunks
+
+    loss(params, chunk) returns the scalar loss of one chunk (or a one-element list), with
+    params passed like the input of any ReverseAutoDiff function for the given mode. Each
+    chunk is swept with retain_graph=False, so its graph is gone before the next chunk is
+    requested. prefetch > 0 pulls up to that many chunks ahead on a background thread,
+    overlapping data loading with differentiation. Returns (value, gradient, number of chunks).
+    '''
+    params = [float(val) for val in params]
+    chunk_iter = _prefetched(iter(chunks), prefetch) if prefetch > 0 else iter(chunks)
+    value, gradient, n_chunks = 0.0, np.zeros(len(params)), 0
+    try:
+        for chunk in chunk_iter:
+            def chunk_loss(p, chunk=chunk):
+                out = loss(p, chunk)
+                return out if isinstance(out, (list, tuple)) else [out]
+            rad = ReverseAutoDiff(chunk_loss, mode=mode)
+            values, product = rad.vjp(params, [1.0])
+            value += values[0]
+            gradient += product
+            n_chunks += 1
+            #drop the references to this chunk before pulling the next one
+            del chunk, rad, chunk_loss
+    finally:
+        #stop the prefetch thread at once when a chunk fails, not when the traceback is collected
+        if prefetch > 0:
+            chunk_iter.close()
+    return value, gradient, n_chunks
@@ -0,0 +1,272 @@
+#array-backed Wengert tape for reverse mode automatic differentiation
+#each recorded operation is one row in a set of growable NumPy arrays instead of a ReverseNode object
+import numpy as np
+try:
+    from . import registry
+except ImportError:
+    import registry
+
+#op codes, one per primitive; binary ops with a plain number store it in the consts column
+(INPUT, ADD, SUB, MUL, DIV, POW,
+ ADD_CONST, RSUB_CONST, MUL_CONST, DIV_CONST, RDIV_CONST, POW_CONST, RPOW_CONST, NEG, POS,
+ SIN, COS, TAN, EXP, ARCSIN, ARCCOS, ARCTAN, SINH, COSH, TANH, LOGISTIC, SQRT, LOG) = range(28)
+
+OP_NAMES = ('input', 'add', 'sub', 'mul', 'div', 'pow',
+            'add_const', 'rsub_const', 'mul_const', 'div_const', 'rdiv_const', 'pow_const', 'rpow_const', 'neg', 'pos',
+            'sin', 'cos', 'tan', 'exp', 'arcsin', 'arccos', 'arctan', 'sinh', 'cosh', 'tanh', 'logistic', 'sqrt', 'log')
+OP_CODES = {name: op for op, name in enumerate(OP_NAMES)}
+
+
+class Tape():
+    '''
+    Wengert list of recorded operations
+
+    Row i holds the op code, up to two parent indices (-1 when unused), the local
+    partial derivative with respect to each parent, the value and an op constant.
+    Rows are appended in evaluation order, so the tape is already topologically sorted.
+    Comparisons made on recorded values are kept in guards as (op, row, other row or -1,
+    constant, outcome).
+    '''
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.ops = np.empty(capacity, dtype=np.int16)
+        self.parents = np.full((capacity, 2), -1, dtype=np.int64)
+        self.partials = np.zeros((capacity, 2))
+        self.values = np.empty(capacity)
+        self.consts = np.zeros(capacity)
+        self.guards = []
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "{class_name}(size={size})".format(class_name=type(self).__name__, size=self.size)
+
+    def _grow(self):
+        #double every column so appends stay amortized O(1)
+        capacity = 2 * len(self.ops)
+        for name in ('ops', 'parents', 'partials', 'values', 'consts'):
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], -1 if name == 'parents' else 0, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def record(self, op, value, parent0=-1, partial0=0.0, parent1=-1, partial1=0.0, const=0.0):
+        if self.size == len(self.ops):
+            self._grow()
+        i = self.size
+        self.ops[i] = op
+        self.values[i] = value
+        #unused slots keep their -1 / 0 fill, so only write what the op actually has
+        if parent0 >= 0:
+            self.parents[i, 0] = parent0
+            self.partials[i, 0] = partial0
+            if parent1 >= 0:
+                self.parents[i, 1] = parent1
+                self.partials[i, 1] = partial1
+        if const:
+            self.consts[i] = const
+        self.size = i + 1
+        return TapeNode(self, i)
+
+    def variable(self, value):
+        return self.record(INPUT, value)
+
+    def backward(self, output_index, seed=1.0, block=65536):
+        #reverse loop over integer indices from the output down to the first row
+        #adjoints are accumulated in a flat list (one float each) and returned as one float array
+        adj = [0.0] * (output_index + 1)
+        adj[output_index] = seed
+
+        #rows are converted to plain lists one block at a time: scalar loops over lists are several
+        #times faster than indexing NumPy element by element, and the block bounds the extra memory
+        for stop in range(output_index + 1, 0, -block):
+            start = max(stop - block, 0)
+            parents0 = self.parents[start:stop, 0].tolist()
+            parents1 = self.parents[start:stop, 1].tolist()
+            partials0 = self.partials[start:stop, 0].tolist()
+            partials1 = self.partials[start:stop, 1].tolist()
+            for k in range(stop - start - 1, -1, -1):
+                a = adj[start + k]
+                p0 = parents0[k]
+                if p0 < 0 or a == 0:
+                    continue
+                adj[p0] += a * partials0[k]
+                p1 = parents1[k]
+                if p1 >= 0:
+                    adj[p1] += a * partials1[k]
+
+        adjoints = np.zeros(self.size)
+        adjoints[:output_index + 1] = adj
+        return adjoints
+
+    def backward_many(self, output_indices, upto=None, seeds=None):
+        #one reverse loop for several outputs: row i carries a len(output_indices)-wide adjoint vector
+        #output_indices may contain -1 for outputs that are not on the tape (their column stays zero)
+        #seeds replaces the unit vectors with one adjoint seed per output (scalars give a vector-Jacobian product)
+        #returns the (upto, *seed shape) adjoints of the first upto rows, e.g. just the inputs
+        m = len(output_indices)
+        upto = self.size if upto is None else upto
+        if seeds is None:
+            seeds = np.eye(m)
+        shape = np.shape(seeds[0]) if m else (0,)
+        last = max(output_indices, default=-1)
+        adj = [None] * (last + 1)
+        for k, row in enumerate(output_indices):
+            if row >= 0:
+                seed = seeds[k]
+                adj[row] = seed if adj[row] is None else adj[row] + seed
+
+        parents = self.parents[:last + 1].tolist()
+        partials = self.partials[:last + 1].tolist()
+        for i in range(last, -1, -1):
+            a = adj[i]
+            p0, p1 = parents[i]
+            if a is None or p0 < 0:
+                continue
+            d0, d1 = partials[i]
+            adj[p0] = a * d0 if adj[p0] is None else adj[p0] + a * d0
+            if p1 >= 0:
+                adj[p1] = a * d1 if adj[p1] is None else adj[p1] + a * d1
+
+        adjoints = np.zeros((upto,) + shape)
+        for i, a in enumerate(adj[:upto]):
+            if a is not None:
+                adjoints[i] = a
+        return adjoints
+
+
+@registry.ufunc_methods
+class TapeNode():
+    '''
+    Handle to one row of a Tape; carries no data besides the tape and its index
+    '''
+    __slots__ = ('tape', 'index', '__weakref__')
+
+    __array_ufunc__ = registry.array_ufunc
+
+    def __init__(self, tape, index):
+        self.tape = tape
+        self.index = index
+
+    @property
+    def val(self):
+        return self.tape.values[self.index]
+
+    def _unary(self, op, val, partial, const=0.0):
+        return self.tape.record(op, val, self.index, partial, const=const)
+
+    def _binary(self, op, val, arg, partial0, partial1):
+        return self.tape.record(op, val, self.index, partial0, arg.index, partial1)
+
+    def __add__(self, arg):
+        if isinstance(arg, TapeNode):
+            return self._binary(ADD, self.val + arg.val, arg, 1.0, 1.0)
+        return self._unary(ADD_CONST, self.val + arg, 1.0, arg)
+
+    def __radd__(self, arg):
+        return self.__add__(arg)
+
+    def __sub__(self, arg):
+        if isinstance(arg, TapeNode):
+            return self._binary(SUB, self.val - arg.val, arg, 1.0, -1.0)
+        return self._unary(ADD_CONST, self.val - arg, 1.0, -arg)
+
+    def __rsub__(self, arg):
+        return self._unary(RSUB_CONST, arg - self.val, -1.0, arg)
+
+    def __mul__(self, arg):
+        if isinstance(arg, TapeNode):
+            return self._binary(MUL, self.val * arg.val, arg, arg.val, self.val)
+        return self._unary(MUL_CONST, self.val * arg, arg, arg)
+
+    def __rmul__(self, arg):
+        return self.__mul__(arg)
+
+    def __truediv__(self, arg):
+        if isinstance(arg, TapeNode):
+            return self._binary(DIV, self.val / arg.val, arg, 1 / arg.val, -(self.val / arg.val**2))
+        return self._unary(DIV_CONST, self.val / arg, 1 / arg, arg)
+
+    def __rtruediv__(self, arg):
+        return self._unary(RDIV_CONST, arg / self.val, -(arg / self.val**2), arg)
+
+    def __pow__(self, arg):
+        if isinstance(arg, TapeNode):
+            val = self.val ** arg.val
+            return self._binary(POW, val, arg, arg.val * self.val ** (arg.val - 1), val * np.log(self.val))
+        return self._unary(POW_CONST, self.val ** arg, arg * self.val ** (arg - 1), arg)
+
+    def __rpow__(self, arg):
+        val = arg ** self.val
+        return self._unary(RPOW_CONST, val, val * np.log(arg), arg)
+
+    def __neg__(self):
+        return self._unary(NEG, -self.val, -1.0)
+
+    def __pos__(self):
+        return self._unary(POS, self.val, 1.0)
+
+    #comparisons are answered from the recorded value and logged as guards on the tape,
+    #so a replay of this recording is only valid while every outcome stays the same
+    def _compare(self, op, arg, outcome):
+        outcome = bool(outcome)
+        if isinstance(arg, TapeNode):
+            self.tape.guards.append((op, self.index, arg.index, 0.0, outcome))
+        else:
+            try:
+                self.tape.guards.append((op, self.index, -1, float(arg), outcome))
+            except (TypeError, ValueError):
+                pass
+        return outcome
+
+    def __eq__(self, arg):
+        try:
+            return self._compare('==', arg, self.val == arg.val)
+        except AttributeError:
+            return self._compare('==', arg, self.val == arg)
+
+    def __ne__(self, arg):
+        try:
+            return self._compare('!=', arg, self.val != arg.val)
+        except AttributeError:
+            return self._compare('!=', arg, self.val != arg)
+
+    def __lt__(self, arg):
+        try:
+            return self._compare('<', arg, self.val < arg.val)
+        except AttributeError:
+            return self._compare('<', arg, self.val < arg)
+
+    def __le__(self, arg):
+        try:
+            return self._compare('<=', arg, self.val <= arg.val)
+        except AttributeError:
+            return self._compare('<=', arg, self.val <= arg)
+
+    def __gt__(self, arg):
+        try:
+            return self._compare('>', arg, self.val > arg.val)
+        except AttributeError:
+            return self._compare('>', arg, self.val > arg)
+
+    def __ge__(self, arg):
+        try:
+            return self._compare('>=', arg, self.val >= arg.val)
+        except AttributeError:
+            return self._compare('>=', arg, self.val >= arg)
+
+    def __repr__(self):
+        return "{class_name}(index={index}, val={val})".format(class_name=type(self).__name__, index=self.index, val=self.val)
+
+
+#elementary functions record one row whose op code matches the primitive's name; extra
+#arguments (the base of log) go into the consts column
+@registry.register_handler(TapeNode)
+def _tape_rule(primitive):
+    op, value, derivative = OP_CODES[primitive.name], primitive.value, primitive.derivative
+    def rule(x, *args):
+        val = value(x.val, *args)
+        return x.tape.record(op, val, x.index, derivative(x.val, val, *args), const=args[0] if args else 0.0)
+    return rule
@@ -0,0 +1,276 @@
+#array-valued nodes for reverse mode automatic differentiation
+#one TensorNode holds a whole NumPy array and one vector-Jacobian product per child, so a dense
+#layer W @ x is a single graph entry whose backward rule is itself a matrix product
+import numpy as np
+try:
+    from . import registry
+    from .graph import topological_order
+except ImportError:
+    import registry
+    from graph import topological_order
+
+
+def _unbroadcast(g, shape):
+    #sum an adjoint back down to the shape of an operand that NumPy broadcast
+    while g.ndim > len(shape):
+        g = g.sum(axis=0)
+    for axis, size in enumerate(shape):
+        if size == 1 and g.shape[axis] != 1:
+            g = g.sum(axis=axis, keepdims=True)
+    return g
+
+
+def _value(x):
+    return x.val if isinstance(x, TensorNode) else x
+
+
+class TensorNode():
+    '''
+    Node of a reverse mode graph whose value is a NumPy array
+
+    children[k] is an input of the operation and vjps[k] maps the adjoint of this node to
+    the adjoint contribution of children[k]; backward leaves the result in adjoint. Operators broadcast like NumPy, and the
+    elementary functions and np ufuncs apply elementwise.
+    '''
+    __slots__ = ('val', 'children', 'vjps', 'adjoint', '__weakref__')
+
+    __array_ufunc__ = registry.array_ufunc
+
+    def __init__(self, val, children=(), vjps=()):
+        self.val = np.asarray(val, dtype=float)
+        self.children = children
+        self.vjps = vjps
+        self.adjoint = None
+
+    def __repr__(self):
+        return "{class_name}(val={val})".format(class_name=type(self).__name__, val=self.val)
+
+    @property
+    def shape(self):
+        return self.val.shape
+
+    @property
+    def ndim(self):
+        return self.val.ndim
+
+    @property
+    def size(self):
+        return self.val.size
+
+    def __len__(self):
+        return len(self.val)
+
+    def __float__(self):
+        return float(self.val)
+
+    def _combine(self, other, val, vjp0, vjp1):
+        #binary op with a node or a constant; adjoints are summed back over broadcast axes
+        if isinstance(other, TensorNode):
+            return TensorNode(val, (self, other), (lambda g: _unbroadcast(vjp0(g), self.shape),
+                                                   lambda g: _unbroadcast(vjp1(g), other.shape)))
+        return TensorNode(val, (self,), (lambda g: _unbroadcast(vjp0(g), self.shape),))
+
+    def __add__(self, other):
+        return self._combine(other, self.val + _value(other), lambda g: g, lambda g: g)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        return self._combine(other, self.val - _value(other), lambda g: g, lambda g: -g)
+
+    def __rsub__(self, other):
+        return TensorNode(other - self.val, (self,), (lambda g: _unbroadcast(-g, self.shape),))
+
+    def __mul__(self, other):
+        b = _value(other)
+        return self._combine(other, self.val * b, lambda g: g * b, lambda g: g * self.val)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        b = _value(other)
+        return self._combine(other, self.val / b, lambda g: g / b, lambda g: -g * self.val / b ** 2)
+
+    def __rtruediv__(self, other):
+        val = other / self.val
+        return TensorNode(val, (self,), (lambda g: _unbroadcast(-g * val / self.val, self.shape),))
+
+    def __pow__(self, other):
+        b = _value(other)
+        val = self.val ** b
+        return self._combine(other, val, lambda g: g * b * self.val ** (b - 1), lambda g: g * val * np.log(self.val))
+
+    def __rpow__(self, other):
+        val = other ** self.val
+        return TensorNode(val, (self,), (lambda g: _unbroadcast(g * val * np.log(other), self.shape),))
+
+    def __neg__(self):
+        return TensorNode(-self.val, (self,), (lambda g: -g,))
+
+    def __pos__(self):
+        return TensorNode(self.val, (self,), (lambda g: g,))
+
+    def __matmul__(self, other):
+        return matmul(self, other)
+
+    def __rmatmul__(self, other):
+        return matmul(other, self)
+
+    def __getitem__(self, index):
+        def vjp(g):
+            adjoint = np.zeros(self.shape)
+            #add.at so repeated fancy indices accumulate
+            np.add.at(adjoint, index, g)
+            return adjoint
+        return TensorNode(self.val[index], (self,), (vjp,))
+
+    #order, dtype and out are accepted so np.reshape(x, ...), np.sum(x) and np.mean(x) reach these methods
+    def reshape(self, *shape, order='C'):
+        if order != 'C':
+            raise ValueError("Only order='C' reshapes are supported.")
+        return TensorNode(self.val.reshape(*shape), (self,), (lambda g: np.reshape(g, self.shape),))
+
+    def transpose(self, *axes):
+        axes = axes[0] if len(axes) == 1 and not isinstance(axes[0], int) else axes
+        axes = tuple(range(self.ndim))[::-1] if not axes else tuple(axes)
+        inverse = tuple(np.argsort(axes))
+        return TensorNode(self.val.transpose(axes), (self,), (lambda g: np.transpose(g, inverse),))
+
+    @property
+    def T(self):
+        return self.transpose()
+
+    def sum(self, axis=None, dtype=None, out=None, keepdims=False):
+        if out is not None:
+            raise ValueError('out= is not supported for nodes.')
+        def vjp(g):
+            if axis is not None and not keepdims:
+                g = np.expand_dims(g, axis)
+            return np.broadcast_to(g, self.shape)
+        return TensorNode(self.val.sum(axis=axis, keepdims=keepdims), (self,), (vjp,))
+
+    def mean(self, axis=None, dtype=None, out=None, keepdims=False):
+        total = self.sum(axis=axis, out=out, keepdims=keepdims)
+        return total / (self.size / max(total.size, 1))
+
+    def dot(self, other):
+        return dot(self, other)
+
+    #comparisons are elementwise on the values, like NumPy
+    def __lt__(self, other):
+        return self.val < _value(other)
+
+    def __le__(self, other):
+        return self.val <= _value(other)
+
+    def __gt__(self, other):
+        return self.val > _value(other)
+
+    def __ge__(self, other):
+        return self.val >= _value(other)
+
+
+def matmul(a, b):
+    '''
+    a @ b for nodes and/or arrays, following np.matmul for 1-D and stacked operands
+    '''
+    a_val, b_val = np.asarray(_value(a), dtype=float), np.asarray(_value(b), dtype=float)
+    val = a_val @ b_val
+    #promote 1-D operands to matrices so both rules are plain (batched) matrix products
+    a2 = a_val[None, :] if a_val.ndim == 1 else a_val
+    b2 = b_val[:, None] if b_val.ndim == 1 else b_val
+
+    def as_matrix(g):
+        return np.reshape(g, np.shape(a2 @ b2))
+
+    def vjp_a(g):
+        adjoint = as_matrix(g) @ np.swapaxes(b2, -1, -2)
+        return _unbroadcast(adjoint[..., 0, :] if a_val.ndim == 1 else adjoint, a_val.shape)
+
+    def vjp_b(g):
+        adjoint = np.swapaxes(a2, -1, -2) @ as_matrix(g)
+        return _unbroadcast(adjoint[..., :, 0] if b_val.ndim == 1 else adjoint, b_val.shape)
+
+    children, vjps = [], []
+    for operand, vjp in ((a, vjp_a), (b, vjp_b)):
+        if isinstance(operand, TensorNode):
+            children.append(operand)
+            vjps.append(vjp)
+    return TensorNode(val, tuple(children), tuple(vjps))
+
+
+def dot(a, b):
+    '''
+    np.dot for vectors and matrices
+    '''
+    if np.ndim(_value(a)) > 2 or np.ndim(_value(b)) > 2:
+        raise ValueError('dot supports vectors and matrices only; use matmul for stacked operands.')
+    return matmul(a, b)
+
+
+def stack(values):
+    '''
+    Stack nodes and/or plain numbers along a new leading axis
+    '''
+    children, vjps = [], []
+    for k, value in enumerate(values):
+        if isinstance(value, TensorNode):
+            children.append(value)
+            vjps.append(lambda g, k=k: g[k])
+    return TensorNode(np.stack([np.asarray(_value(value), dtype=float) for value in values]), tuple(children), tuple(vjps))
+
+
+def backward(output, seed=None, retain_graph=False, keep=()):
+    '''
+    Sweep the adjoint of output down the graph, leaving it in node.adjoint of every leaf
+
+    seed is the adjoint of output (ones of its shape by default), so for an array output
+    the leaves receive the vector-Jacobian product with seed. Interior adjoints are dropped
+    once pushed down, except for the nodes in keep; without retain_graph each node's edges
+    are severed as soon as the sweep has passed it, so the graph is freed as it goes.
+    '''
+    seed = np.ones(output.shape) if seed is None else np.broadcast_to(np.asarray(seed, dtype=float), output.shape)
+    order = topological_order([output], lambda node: node.children)
+    for node in order:
+        node.adjoint = None
+    output.adjoint = seed
+    keep = {id(node) for node in keep}
+    for node in reversed(order):
+        if not node.children:
+            continue
+        g = node.adjoint
+        if g is not None:
+            for child, vjp in zip(node.children, node.vjps):
+                contribution = vjp(g)
+                child.adjoint = contribution if child.adjoint is None else child.adjoint + contribution
+        if id(node) not in keep:
+            node.adjoint = None
+        if not retain_graph:
+            node.children = node.vjps = ()
+
+
+def grad(output, inputs, seed=None, retain_graph=False):
+    '''
+    Adjoints of output with respect to each node in inputs, in the shapes of the inputs
+    '''
+    for x in inputs:
+        x.adjoint = None
+    backward(output, seed, retain_graph, keep=inputs)
+    adjoints = []
+    for x in inputs:
+        adjoints.append(np.zeros(x.shape) if x.adjoint is None else np.array(x.adjoint, dtype=float))
+        x.adjoint = None
+    return adjoints
+
+
+#elementary functions and their np ufuncs apply elementwise
+@registry.register_handler(TensorNode)
+def _tensor_rule(primitive):
+    value, derivative = primitive.value, primitive.derivative
+    def rule(x, *args):
+        val = value(x.val, *args)
+        partial = derivative(x.val, val, *args)
+        return TensorNode(val, (x,), (lambda g: g * partial,))
+    return rule
@@ -1,3 +1,13 @@
 pytest test_dual.py
 pytest test_elemental.py
 pytest test_ad.py
+pytest test_jacobian.py
+pytest test_reverse.py
+pytest test_tape.py
+pytest test_compiler.py
+pytest test_cache.py
+pytest test_tensor.py
+pytest test_checkpoint.py
+pytest test_streaming.py
+pytest test_serialize.py
+pytest test_incremental.py
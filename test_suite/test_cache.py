@@ -0,0 +1,70 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.cache import LRUCache
+from src.elementary_functions import sin, log
+import numpy as np
+
+
+class Test_Cache:
+    '''
+    Test class for the value/Jacobian result cache
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def counting(calls):
+        def f(x):
+            calls.append(1)
+            return [x[0] * x[1] + 2 * sin(x[0]) ** 2 + 2, 1, x[2] * x[1] + log(x[0])]
+        return f
+
+    def test_hits_and_misses(self):
+        for engine, method in ((AD, 'forward_mode'), (RAD, 'reverse_mode')):
+            calls = []
+            func = engine(self.counting(calls), cache_size=4)
+            vals, jacob = getattr(func, method)([2, 2, 3])
+            n_calls = len(calls)
+            again_vals, again_jacob = getattr(func, method)([2.0, 2.0, 3.0])
+            assert len(calls) == n_calls
+            assert np.array_equal(again_vals, vals) and np.array_equal(again_jacob, jacob)
+            assert func.cache.info()['jacobians']['hits'] == 1
+            assert func.cache.info()['values']['misses'] == 1
+
+            # a value-only query is served by the earlier full evaluation
+            values = func.get_val([2, 2, 3]) if engine is AD else func.get_vals([2, 2, 3])
+            assert len(calls) == n_calls and np.array_equal(values, vals)
+
+            # cached results are copies
+            again_jacob[:] = 0
+            assert np.array_equal(getattr(func, method)([2, 2, 3])[1], jacob)
+
+    def test_replaced_function(self):
+        func = AD(lambda x: [x[0] * x[1]], cache_size=2)
+        assert np.array_equal(func.get_jacobian([3, 4]), [[4, 3]])
+        func.function = lambda x: [x[0] + x[1]]
+        assert len(func.cache.values) == len(func.cache.jacobians) == 0
+        assert np.array_equal(func.get_jacobian([3, 4]), [[1, 1]])
+
+        rad = RAD(lambda x: [x[0] * x[1]], cache_size=2)
+        assert np.array_equal(rad.get_jacobian([3, 4]), [4, 3])
+        rad.func = lambda x: [x[0] - x[1]]
+        assert np.array_equal(rad.get_jacobian([3, 4]), [1, -1])
+
+    def test_retain_graph(self):
+        # a retained graph is built even when the Jacobian is already cached
+        rad = RAD(lambda x: [x[0] * x[1]], cache_size=2)
+        jacob = rad.get_jacobian([3, 4])
+        assert rad.graph is None
+        assert np.array_equal(rad.get_jacobian([3, 4], retain_graph=True), jacob)
+        assert rad.graph[0].child0 is not None and rad.bases[0] is not None
+        assert rad.cache.info()['jacobians']['hits'] == 0
+
+    def test_eviction(self):
+        for eviction, survivor in (('lru', 'a'), ('fifo', 'b')):
+            cache = LRUCache(2, eviction)
+            cache.put('a', 1)
+            cache.put('b', 2)
+            cache.get('a')
+            cache.put('c', 3)
+            assert len(cache) == 2 and cache.evictions == 1
+            assert cache.get(survivor) is not None
+        assert AD(lambda x: x).cache is None
@@ -0,0 +1,64 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.checkpoint import CheckpointedLoop, checkpoint, binomial, repetitions_for, snapshots_for
+from src.elementary_functions import sin, exp
+from src.tensor import TensorNode, grad
+import numpy as np
+
+
+class Test_Checkpoint:
+    '''
+    Test class for checkpointed reverse mode
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def step(x):
+        return [x[0] + 0.01 * x[1], x[1] - 0.01 * sin(x[0])]
+
+    def unrolled(self, n_steps):
+        def f(x):
+            for _ in range(n_steps):
+                x = self.step(x)
+            return x
+        return f
+
+    def test_matches_full_graph(self):
+        for n_steps, snapshots in ((1, 0), (7, 0), (7, 2), (100, 3), (300, 1)):
+            loop = CheckpointedLoop(self.step, n_steps, snapshots=snapshots, record=True)
+            vals, product = loop.vjp([0.5, 0.1], [1.0, 2.0])
+            expected_vals, expected = RAD(self.unrolled(n_steps)).vjp([0.5, 0.1], [1.0, 2.0])
+            assert np.allclose(vals, expected_vals) and np.allclose(product, expected)
+            assert loop.peak_snapshots <= snapshots
+            # no step runs forwards more than repetitions times, the output included
+            runs = [0] * n_steps
+            for action in loop.schedule:
+                if action[0] == 'advance':
+                    for k in range(action[1], action[2]):
+                        runs[k] += 1
+            assert max(runs) <= loop.repetitions and loop.advances == sum(runs)
+            assert [action[1] for action in loop.schedule if action[0] == 'reverse'] == list(range(n_steps - 1, -1, -1))
+
+    def test_budget(self):
+        assert binomial(3, 4) == 35
+        assert repetitions_for(35, 3) == 4 and repetitions_for(36, 3) == 5
+        assert snapshots_for(35, 4) == 3
+        loop = CheckpointedLoop(self.step, 200, repetitions=3, mode='tape')
+        assert loop.repetitions <= 3
+        assert np.allclose(loop.get_jacobian([0.5, 0.1]), AD(self.unrolled(200)).get_jacobian([0.5, 0.1]))
+        gradient = loop.gradient([0.5, 0.1], lambda x: [x[0] * x[1]])
+        assert np.allclose(gradient, RAD(lambda x: [self.unrolled(200)(x)[0] * self.unrolled(200)(x)[1]]).get_jacobian([0.5, 0.1]))
+
+    def test_checkpoint_primitive(self):
+        W = np.array([[0.5, -0.2], [0.1, 0.3]])
+
+        def segment(x):
+            for _ in range(5):
+                x = np.tanh(W @ x) + x
+            return x
+
+        x = TensorNode([0.3, -0.7])
+        out = (exp(checkpoint(segment, x)) * 2).sum()
+        assert len(out.children[0].children[0].children[0].children) == 1
+        x_full = TensorNode([0.3, -0.7])
+        expected = grad((exp(segment(x_full)) * 2).sum(), [x_full])[0]
+        assert np.allclose(grad(out, [x])[0], expected)
@@ -0,0 +1,100 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.compiler import CompiledFunction
+from src.elementary_functions import sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log
+import numpy as np
+
+
+class Test_Compiler:
+    '''
+    Test class for trace-once, replay-many compiled functions
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def fn(x):
+        fns = [sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log]
+        return [f(x[0] * x[1]) for f in fns] + [x[0] ** x[1], x[0] / x[1], 2 / x[1], 3 - x[0], -x[0], x[0] ** 3,
+                                               x[1] - 1, log(x[1], 2), 1, x[0]]
+
+    def test_reverse_compile(self):
+        rad = RAD(self.fn)
+        compiled = rad.compile()
+        assert rad.compile() is compiled
+        for vals in ([0.3, 0.7], [0.2, 0.1], [0.5, 0.9]):
+            values, jacob = compiled(vals)
+            assert np.allclose(values, rad.get_vals(vals))
+            assert np.allclose(jacob, rad.get_jacobian(vals))
+        assert len(compiled.programs) == 1
+
+    def test_forward_compile(self):
+        ad = AD(self.fn)
+        compiled = ad.compile()
+        for vals in ([0.3, 0.7], [0.2, 0.1]):
+            values, jacob = compiled(vals)
+            assert np.allclose(values, ad.get_val(vals))
+            assert np.allclose(jacob, ad.get_jacobian(vals))
+
+    def test_single_output(self):
+        compiled = RAD(lambda x: [x[0] * x[1] + sin(x[0])]).compile()
+        values, jacob = compiled([1, 2])
+        assert np.allclose(values, [2 + np.sin(1)])
+        assert np.allclose(jacob, [2 + np.cos(1), 1])
+
+    def test_division_by_zero(self):
+        # the inputs stay NumPy scalars, so a zero division gives inf and nan like the tape instead of raising
+        f = lambda x: [1 / x[0], x[1] / x[0]]
+        with np.errstate(all='ignore'):
+            values, jacob = RAD(f).compile()([0.0, 1.0])
+            assert np.array_equal(values, [np.inf, np.inf])
+            np.testing.assert_array_equal(jacob, RAD(f, mode='tape').get_jacobian(np.array([0.0, 1.0])))
+            assert np.array_equal(AD(f).compile()([0.0, 1.0])[0], [np.inf, np.inf])
+
+    def test_guards(self):
+        def piecewise(x):
+            y = x[0] * x[1]
+            if y > 1:
+                return [sin(y)]
+            elif x[0] < x[1]:
+                return [x[0] ** 2]
+            return [x[1] ** 3]
+
+        rad = RAD(piecewise)
+        compiled = rad.compile()
+        for vals in ([2, 3], [0.5, 1], [3, 1], [0.5, 0.1], [0.1, 0.5]):
+            values, jacob = compiled(vals)
+            assert np.allclose(values, rad.get_vals(vals))
+            assert np.allclose(jacob, rad.get_jacobian(vals))
+        # one specialization per branch, and each was reused once it existed
+        assert len(compiled.programs[2]) == 3
+        assert compiled.retraces == 2
+
+    def test_optimize(self):
+        def redundant(x):
+            y = sin(x[0]) + sin(x[0]) * 1
+            z = x[0] * x[1] - x[1] * x[0]
+            unused = exp(x[1]) ** 3
+            if z * 2 + 1 > 0.5 and x[0] < 2:
+                return [y + z, 1, x[0] ** 1 + 0, x[1] * 0 + cos(x[1])]
+            return [y]
+
+        compiled = RAD(redundant).compile()
+        plain = CompiledFunction(redundant, optimize=False)
+        for vals in ([0.3, 0.7], [1.2, -0.4]):
+            values, jacob = compiled(vals)
+            expected_values, expected_jacob = plain(vals)
+            assert np.allclose(values, expected_values) and np.allclose(jacob, expected_jacob)
+        report = compiled.reports[2][0]
+        assert report['before'] == 19 and report['after'] == 5
+        assert report['merged'] == 2 and report['folded'] == 9 and report['pruned'] == 3
+        # the guard on the folded z * 2 + 1 is dropped, x[0] < 2 stays
+        assert 'raise _GuardFailure' in compiled.sources[2][0]
+        assert compiled([3.0, 0.1])[0].shape == (1,)
+
+    def test_optimize_forward(self):
+        ad = AD(self.fn)
+        compiled = ad.compile()
+        values, jacob = compiled([0.3, 0.7])
+        assert np.allclose(values, ad.get_val([0.3, 0.7])) and np.allclose(jacob, ad.get_jacobian([0.3, 0.7]))
+        # x[0] * x[1] is recorded once per elementary function but kept once
+        report = compiled.reports[2][0]
+        assert report['merged'] == 12 and report['after'] < report['before']
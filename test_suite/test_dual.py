@@ -117,6 +117,26 @@ class Test_Dual_Number:
         assert pow3.dual == (dual1.real ** dual2.real) * (dual2.dual * np.log(dual1.real) + dual1.dual * dual2.real / dual1.real)
         assert isinstance(pow3, DN)
 
+        # zero base: n = 0 and n = 1 stay exact, negative exponents give inf instead of raising
+        zero = DN(0, 1)
+        assert ((zero ** 0).real, (zero ** 0).dual) == (1, 0)
+        assert ((zero ** 1).real, (zero ** 1).dual) == (0, 1)
+        assert np.isinf((zero ** -1).real)
+        rows = DN(np.array([0.0, 2.0]), np.array([1.0, 1.0]))
+        with np.errstate(all='raise'):
+            for n, dual in ((0, [0, 0]), (1, [1, 1]), (2, [0, 4])):
+                assert np.array_equal((rows ** n).dual, dual)
+
+        # nested duals carry second derivatives through the power rule, like repeated products
+        x = DN(DN(2.0, 1.0), DN(1.0, 0.0))
+        for n in (0, 1, 3):
+            power, product = x ** n, DN(DN(1.0, 0.0), DN(0.0, 0.0))
+            for _ in range(n):
+                product = product * x
+            assert (power.real.real, power.real.dual, power.dual.real, power.dual.dual) == \
+                   (product.real.real, product.real.dual, product.dual.real, product.dual.dual)
+        assert (x ** 3).dual.dual == 12
+
     def test_radd(self):
         dual1 = DN(1, 2)
 
@@ -236,4 +256,63 @@ class Test_Dual_Number:
         assert dual3 <= dual1
         assert dual1 <= dual3
         assert 8 >= dual2
-        assert dual2 <= 8
\ No newline at end of file
+        assert dual2 <= 8
+
+    def test_vector_dual(self):
+        dual1 = DN(2, np.array([1., 0.]))
+        dual2 = DN(3, np.array([0., 1.]))
+
+        prod = dual1 * dual2
+        assert prod.real == 6
+        assert np.array_equal(prod.dual, [3, 2])
+
+        quot = dual1 / dual2
+        assert np.allclose(quot.dual, [1 / 3, -2 / 9])
+
+        pow1 = dual1 ** 3
+        assert np.array_equal(pow1.dual, [12, 0])
+
+        assert dual1 == DN(2, np.array([1., 0.]))
+        assert dual1 != dual2
+
+    def test_taylor_number(self):
+        from src.dual import TaylorNumber as TN
+        import math
+        x = TN([0.5, 1, 0, 0, 0])
+        factorials = np.array([math.factorial(k) for k in range(5)])
+
+        assert np.allclose((x * x).coeffs, [0.25, 1, 1, 0, 0])
+        assert np.allclose((1 / x).coeffs, [(-1) ** k * 0.5 ** -(k + 1) for k in range(5)])
+        assert np.allclose((x ** 3).coeffs, [0.125, 0.75, 1.5, 1, 0])
+        assert np.allclose(x.exp().coeffs, np.exp(0.5) / factorials)
+        assert np.allclose(x.log().exp().coeffs, x.coeffs)
+        assert np.allclose((x ** 0.5).coeffs, x.sqrt().coeffs)
+        assert x > 0.4 and x == TN([0.5, 1, 0, 0, 0])
+
+    def test_hyper_dual_number(self):
+        from src.dual import HyperDualNumber as HD
+        x, y = HD(0.5, 1, 0, 0), HD(2.0, 0, 1, 0)
+
+        # the e1 e2 part of f(x, y) is the mixed partial d2f/dxdy
+        prod = x * y
+        assert (prod.real, prod.eps1, prod.eps2, prod.eps12) == (1.0, 2.0, 0.5, 1.0)
+        quot = x / y
+        assert np.isclose(quot.eps12, -1 / 4) and np.isclose(quot.eps1, 0.5)
+        power = x ** y
+        assert np.isclose(power.eps12, 0.5 ** 1 * (1 + 2 * np.log(0.5)))
+        square = HD(3.0, 1, 1, 0) ** 2
+        assert (square.eps1, square.eps12) == (6.0, 2.0)
+        assert (HD(0.0, 1, 1, 0) ** 1).eps12 == 0
+        with np.errstate(all='ignore'):
+            root = HD(0.0, 1, 1, 0) ** 0.5
+        assert root.real == 0 and np.isinf(root.eps1) and not np.isfinite(root.eps12)
+        rpow = 2 ** HD(1.0, 1, 1, 0)
+        assert np.isclose(rpow.eps12, 2 * np.log(2) ** 2)
+        recip = 1 / HD(2.0, 1, 1, 0)
+        assert np.isclose(recip.eps12, 2 / 8)
+        diff = 3 - x
+        assert diff.real == 2.5 and diff.eps1 == -1
+        assert x < y and x <= 0.5 and y > x and y >= 2 and x == HD(0.5, 1, 0, 0) and x != 0.5
+
+        vector = HD(1.0, np.array([1.0, 0.0]), np.array([1.0, 1.0]), np.zeros(2)) * HD(2.0, np.array([0.0, 1.0]), 0.0, 0.0)
+        assert np.allclose(vector.eps12, [0, 1])
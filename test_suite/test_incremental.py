@@ -0,0 +1,61 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.incremental import IncrementalTape
+from src.elementary_functions import sin, exp, log
+import numpy as np
+
+
+class Test_Incremental:
+    '''
+    Test class for incremental re-evaluation
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def separable(x):
+        # one independent output per input: a change to x[i] only reaches output i
+        return [sin(x[i]) * exp(x[i] * 0.5) + 2 for i in range(len(x))] + [1]
+
+    @staticmethod
+    def coupled(x):
+        y = x[0] * x[1]
+        if y > 1:
+            return [sin(y) + x[2] ** 2, log(x[2], 2) * y]
+        return [y / x[2], x[0] - exp(x[1])]
+
+    def test_matches_full_evaluation(self):
+        rng = np.random.default_rng(1)
+        for func, n in ((self.separable, 6), (self.coupled, 3)):
+            incremental, reference = RAD(func, incremental=True), RAD(func)
+            x = rng.uniform(0.5, 1.5, n)
+            for _ in range(20):
+                x[rng.integers(n)] += rng.normal(scale=0.3)
+                assert np.allclose(incremental.get_vals(list(x)), reference.get_vals(list(x)))
+                assert np.allclose(incremental.get_jacobian(list(x)), reference.get_jacobian(list(x)))
+            ad = AD(func, incremental=True)
+            assert np.allclose(ad.get_jacobian(list(x)), AD(func).get_jacobian(list(x)))
+            assert np.allclose(ad.get_val(list(x)), AD(func).get_val(list(x)))
+
+    def test_touches_only_downstream_rows(self):
+        tape = IncrementalTape(self.separable)
+        x = np.linspace(0.1, 1, 10)
+        values, jacob = tape.evaluate(x)
+        assert jacob.shape == (11, 10) and tape.touched == tape.swept == 10 + 10 * 5
+        x[3] += 0.2
+        values, jacob = tape.evaluate(x)
+        # sin, mul_const, exp, mul and add_const of output 3, swept back down to x[3]
+        assert tape.touched == 5 and tape.swept == 4
+        assert np.allclose(jacob, RAD(self.separable).get_jacobian(list(x)))
+        tape.evaluate(x)
+        assert tape.touched == tape.swept == 0
+
+    def test_retraces(self):
+        tape = IncrementalTape(self.coupled)
+        tape.evaluate([2.0, 3.0, 1.0])
+        values, _ = tape.evaluate([0.2, 3.0, 1.0])
+        assert tape.retraces == 1 and np.allclose(values, RAD(self.coupled).get_vals([0.2, 3.0, 1.0]))
+        # a new input length traces without counting as a guard failure
+        assert len(IncrementalTape(self.separable).evaluate([1.0, 2.0])[0]) == 3
+        rad = RAD(self.separable, incremental=True)
+        first = rad.incremental
+        rad.func = self.coupled
+        assert rad.incremental is not first and rad.get_vals([2.0, 3.0, 1.0]).shape == (2,)
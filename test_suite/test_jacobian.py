@@ -0,0 +1,262 @@
+from src.ad import AutoDiff as AD
+from src.elementary_functions import sin, log
+import numpy as np
+import pytest
+
+
+class Test_Jacobian:
+    '''
+    Test class for forward mode Jacobians
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def fn(x):
+        return [x[0] * x[1] + 2 * sin(x[0]) ** 2 + 2, 1, x[2] * x[1] + log(x[0])]
+
+    @staticmethod
+    def expected(x):
+        return np.array([[x[1] + 4 * np.sin(x[0]) * np.cos(x[0]), x[0], 0],
+                         [0, 0, 0],
+                         [1 / x[0], x[2], x[1]]])
+
+    def test_vector_mode(self):
+        vals = [2, 2, 3]
+        jacob = AD(self.fn).get_jacobian(vals)
+        assert jacob.shape == (3, 3)
+        assert np.allclose(jacob, self.expected(vals))
+
+    def test_chunk_size(self):
+        vals = [-2., 0.5, 3]
+        func = AD(lambda x: [x[0] * x[1] + sin(x[0]), x[0] ** 2, x[2] * x[1]])
+        full = func.get_jacobian(vals)
+        for chunk_size in (1, 2, 3, 10):
+            assert np.allclose(func.get_jacobian(vals, chunk_size=chunk_size), full)
+        assert np.allclose(full[1], [-4, 0, 0])
+
+    def test_forward_mode_batch(self):
+        X = np.array([[2, 2, 3], [1, -1, 0.5], [0.3, 4, 2]])
+        func = AD(self.fn)
+        vals, jacob = func.forward_mode_batch(X)
+        assert vals.shape == (3, 3)
+        assert jacob.shape == (3, 3, 3)
+        for i, row in enumerate(X):
+            assert np.allclose(vals[i], func.get_val(list(row)))
+            assert np.allclose(jacob[i], self.expected(row))
+        assert np.allclose(func.forward_mode_batch(X, chunk_size=2)[1], jacob)
+
+    def test_sparse_jacobian(self):
+        from src.sparsity import jacobian_sparsity, color_columns
+        n = 30
+
+        def banded(x):
+            return [sin(x[i]) * x[i + 1] - x[i - 1] ** 2 for i in range(1, n - 1)] + [x[0] + x[n - 1], 3]
+
+        vals = list(np.linspace(0.1, 2, n))
+        pattern = jacobian_sparsity(banded, vals)
+        assert pattern.nnz == 3 * (n - 2) + 2
+        colors, n_colors = color_columns(pattern)
+        assert n_colors == 3
+
+        func = AD(banded)
+        jacob = func.get_sparse_jacobian(vals)
+        assert jacob.format == 'csr'
+        assert np.allclose(jacob.toarray(), func.get_jacobian(vals))
+        assert np.allclose(func.get_sparse_jacobian(vals, sparsity=pattern, chunk_size=1).toarray(), jacob.toarray())
+
+    def test_adaptive_mode(self):
+        from src.ad import AdaptiveAutoDiff
+
+        def wide(x):
+            return [sum((sin(v) * v for v in x), 0)]
+
+        def tall(x):
+            return [sin(x[0] * k) for k in range(200)]
+
+        vals = list(np.linspace(0.1, 1, 2000))
+        func = AdaptiveAutoDiff(wide)
+        jacob = func.get_jacobian(vals)
+        assert func.decision == 'reverse'
+        assert func.costs['reverse'] < func.costs['forward']
+        assert jacob.shape == (1, 2000)
+        assert np.allclose(jacob[0], np.sin(vals) + np.array(vals) * np.cos(vals))
+
+        func = AdaptiveAutoDiff(tall)
+        assert func.get_jacobian([0.3]).shape == (200, 1)
+        assert func.decision == 'forward'
+        assert func.costs['outputs'] == 200
+        assert len(func.decisions) == 1
+
+    def test_adaptive_crossover(self):
+        from src.ad import AdaptiveAutoDiff
+
+        def blocks(x):
+            # ten outputs, each summing every tenth term
+            return [sum((sin(x[i]) * x[(i + 1) % len(x)] for i in range(k, len(x), 10)), 0) for k in range(10)]
+
+        # measured: forward is faster up to n ~ 1000, reverse from n ~ 1300 on
+        func = AdaptiveAutoDiff(blocks)
+        assert func.choose(list(np.linspace(0.1, 1, 700))) == 'forward'
+        assert func.choose(list(np.linspace(0.1, 1, 1600))) == 'reverse'
+        assert func.choose(list(np.linspace(0.1, 1, 3000))) == 'reverse'
+
+    def test_jvp(self):
+        vals, v = [2, 2, 3], [1, -0.5, 4]
+        func = AD(self.fn)
+        values, product = func.jvp(vals, v)
+        assert np.allclose(values, func.get_val(vals))
+        assert np.allclose(product, self.expected(vals) @ np.array(v))
+
+        # errors raised by the function itself are not reported as an input count mismatch
+        with pytest.raises(ZeroDivisionError):
+            AD(lambda x: [x[0] / 0]).jvp([1.0], [1.0])
+        with pytest.raises(ZeroDivisionError):
+            AD(lambda x: [x[0] / 0]).get_jacobian([1.0])
+        with pytest.raises(IndexError, match='Number of inputs'):
+            func.get_jacobian([2, 2])
+        with pytest.raises(IndexError, match='Number of inputs'):
+            func.jvp([2, 2], [1, 1])
+
+    def test_taylor(self):
+        from src.elementary_functions import cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt
+
+        def f(x):
+            fns = [sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log]
+            return [g(x[0] * x[1]) for g in fns] + [x[0] ** x[1], x[0] / x[1], log(x[1], 2), 1]
+
+        func = AD(f)
+        vals, direction, h = np.array([0.3, 0.7]), np.array([1.0, -0.5]), 1e-4
+        derivs = func.taylor(list(vals), list(direction), order=4)
+        assert derivs.shape == (17, 5)
+        assert np.allclose(derivs[:, 0], func.get_val(list(vals)))
+        assert np.allclose(derivs[:, 1], func.jvp(list(vals), list(direction))[1])
+        # each order is the directional derivative of the one below it
+        for k in range(2, 5):
+            upper = func.taylor(list(vals + h * direction), list(direction), order=k - 1)[:, k - 1]
+            lower = func.taylor(list(vals - h * direction), list(direction), order=k - 1)[:, k - 1]
+            assert np.allclose(derivs[:, k], (upper - lower) / (2 * h), rtol=1e-5, atol=1e-5)
+
+    def test_taylor_high_order(self):
+        from src.elementary_functions import exp
+        order = 150
+        factorials = np.cumprod(np.concatenate(([1.0], np.arange(1, order + 1))))
+        squares = AD(lambda x: [x[0] * x[0]]).taylor([0.5], [1.0], order=order)[0]
+        assert np.allclose(squares[:3], [0.25, 1, 2]) and np.all(squares[3:] == 0)
+        # d^k/dt^k exp(2x) = 2^k exp(2x), checked as Taylor coefficients (derivative / k!)
+        coeffs = AD(lambda x: [exp(2 * x[0])]).taylor([0.5], [1.0], order=order)[0] / factorials
+        expected = np.exp(1.0) * 2.0 ** np.arange(order + 1) / factorials
+        assert np.allclose(coeffs, expected, rtol=1e-10, atol=0)
+
+    def test_hessian(self):
+        from src.ad import ReverseAutoDiff as RAD
+        from src.elementary_functions import cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt
+
+        def f(x):
+            fns = [sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log]
+            return [g(x[0] * x[1] + x[2] / 4) for g in fns] + [x[0] ** x[1] - 2 ** x[2], x[0] / x[1] * x[2] ** 3, log(x[1], 2), 1]
+
+        vals = [0.3, 0.7, 0.2]
+        hessian = AD(f).get_hessian(vals)
+        assert hessian.shape == (17, 3, 3)
+        assert np.allclose(hessian, np.transpose(hessian, (0, 2, 1)))
+        for k in range(16):
+            assert np.allclose(hessian[k], RAD(lambda x: [f(x)[k]]).hessian(vals))
+        assert np.all(hessian[16] == 0)
+
+    def test_executor(self):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        vals = [2, 2, 3]
+        X = np.array([[2, 2, 3], [1, -1, 0.5], [0.3, 4, 2], [1, 1, 1], [2, 0.5, 1]])
+        func = AD(self.fn)
+        batch_vals, batch_jacob = func.forward_mode_batch(X)
+        for pool in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with pool(2) as executor:
+                assert np.allclose(func.get_jacobian(vals, executor=executor), self.expected(vals))
+                assert np.allclose(func.get_jacobian(vals, chunk_size=2, executor=executor), self.expected(vals))
+                par_vals, par_jacob = func.forward_mode_batch(X, executor=executor, row_chunk_size=2)
+                assert np.allclose(par_vals, batch_vals)
+                assert np.allclose(par_jacob, batch_jacob)
+
+    def test_shared_memory(self):
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        X = np.random.default_rng(0).uniform(0.5, 2, (101, 3))
+        func = AD(self.fn)
+        batch_vals, batch_jacob = func.forward_mode_batch(X)
+        for pool in (ThreadPoolExecutor, ProcessPoolExecutor):
+            with pool(2) as executor:
+                par_vals, par_jacob = func.forward_mode_batch(X, executor=executor, row_chunk_size=17, shared_memory=True)
+                assert np.allclose(par_vals, batch_vals)
+                assert np.allclose(par_jacob, batch_jacob)
+
+    def test_shared_memory_tracking(self, tmp_path):
+        # workers forked before the segments exist start resource trackers of their own, spawned ones share
+        # the parent's; neither may warn about or unregister a segment the parent still owns. The trackers
+        # keep stderr open until they exit, so run() returns only after any warning has been written
+        import os
+        import subprocess
+        import sys
+        script = tmp_path / 'shared_rows.py'
+        script.write_text(
+            "import multiprocessing as mp\n"
+            "from concurrent.futures import ProcessPoolExecutor\n"
+            "import numpy as np\n"
+            "from src.ad import AutoDiff as AD\n"
+            "from src.elementary_functions import sin\n"
+            "def f(x):\n"
+            "    return [sin(x[0]) * x[1]]\n"
+            "if __name__ == '__main__':\n"
+            "    X = np.random.default_rng(0).uniform(0.5, 2, (40, 2))\n"
+            "    for method in ('fork', 'spawn'):\n"
+            "        with ProcessPoolExecutor(2, mp_context=mp.get_context(method)) as executor:\n"
+            "            executor.submit(abs, 0).result()\n"
+            "            AD(f).forward_mode_batch(X, executor=executor, row_chunk_size=5, shared_memory=True)\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (root, os.environ.get('PYTHONPATH')))))
+        result = subprocess.run([sys.executable, str(script)], env=env, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stderr == ''
+
+    def test_numpy_ufuncs(self):
+        from src.ad import ReverseAutoDiff as RAD
+        from src.elementary_functions import exp, arctan, tanh
+
+        def f_numpy(x):
+            return [np.sin(x[0]) * np.exp(x[1]) + np.log(x[0]) + np.log10(x[1]),
+                    np.sqrt(x[1]) / np.float64(2) - np.arctan(x[0]), np.power(2, x[0]) + np.tanh(-x[1])]
+
+        def f_ad(x):
+            return [sin(x[0]) * exp(x[1]) + log(x[0]) + log(x[1], 10),
+                    x[1] ** 0.5 / 2 - arctan(x[0]), 2 ** x[0] + tanh(-x[1])]
+
+        vals = [0.7, 1.3]
+        expected = AD(f_ad).get_jacobian(vals)
+        assert np.allclose(AD(f_numpy).get_jacobian(vals), expected)
+        assert np.allclose(AD(f_numpy).compile()(vals)[1], expected)
+        for mode in ('graph', 'tape'):
+            assert np.allclose(RAD(f_numpy, mode=mode).get_jacobian(vals), expected)
+        assert np.allclose(RAD(lambda x: f_numpy(x)[:1]).hessian(vals), RAD(lambda x: f_ad(x)[:1]).hessian(vals))
+
+        X = np.array([[0.7, 1.3], [1.5, 0.2], [0.3, 2.0]])
+        assert np.allclose(AD(f_numpy).forward_mode_batch(X)[1], AD(f_ad).forward_mode_batch(X)[1])
+
+    def test_numpy_array_ufuncs(self):
+        from src.ad import ReverseAutoDiff as RAD
+        from src.elementary_functions import exp, sqrt
+
+        # ufuncs on object arrays of AD values call the ufunc-named method of every element
+        def f_numpy(x):
+            a = np.asarray(x)
+            return list(np.sin(a) * np.exp(a[::-1]) + np.log2(a)) + [np.sum(np.sqrt(a) / a)]
+
+        def f_ad(x):
+            return [sin(x[i]) * exp(x[len(x) - 1 - i]) + log(x[i], 2) for i in range(len(x))] + \
+                   [sum(sqrt(xi) / xi for xi in x)]
+
+        vals = [0.7, 1.3, 2.1]
+        expected = AD(f_ad).get_jacobian(vals)
+        assert np.allclose(AD(f_numpy).get_jacobian(vals), expected)
+        assert np.allclose(AD(f_numpy).jvp(vals, [1, 0, 0])[1], expected[:, 0])
+        for mode in ('graph', 'tape'):
+            assert np.allclose(RAD(f_numpy, mode=mode).get_jacobian(vals), expected)
+        assert np.allclose(AD(f_numpy).taylor(vals, [1, 0, 0], 3), AD(f_ad).taylor(vals, [1, 0, 0], 3))
+        assert np.allclose(AD(lambda x: f_numpy(x)[-1:]).get_hessian(vals), AD(lambda x: f_ad(x)[-1:]).get_hessian(vals))
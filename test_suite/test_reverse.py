@@ -0,0 +1,128 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.elementary_functions import sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log
+import numpy as np
+
+
+class Test_Reverse_Auto_Diff:
+    '''
+    Test class for ReverseAutoDiff implementation
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def fn(x):
+        return [x[0] * x[1] + 2 * sin(x[0]) ** 2 + 2, 1, x[2] * x[1] + log(x[0])]
+
+    @staticmethod
+    def fn_elementary(x):
+        fns = [sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log]
+        return [f(x[0] * x[1]) for f in fns] + [x[0] ** x[1], x[0] / x[1], 2 / x[1], 3 - x[0], -x[0]]
+
+    def test_matches_forward(self):
+        for func, vals in ((self.fn, [2, 2, 3]), (self.fn_elementary, [0.3, 0.7])):
+            vals_r, jacob_r = RAD(func).reverse_mode(vals)
+            vals_f, jacob_f = AD(func).forward_mode(vals)
+            assert np.allclose(vals_r, vals_f)
+            assert np.allclose(jacob_r, jacob_f)
+
+    def test_single_output(self):
+        jacob = RAD(lambda x: [x[0] * x[1]]).get_jacobian([3, 4])
+        assert np.array_equal(jacob, [4, 3])
+
+    def test_deep_chain(self):
+        def f(x):
+            y = x[0]
+            for _ in range(50000):
+                y = y * 1.0 + x[1]
+            return [y]
+        assert np.array_equal(RAD(f).get_jacobian([1.0, 2.0]), [1, 50000])
+
+    def test_shared_subexpressions(self):
+        # 200 doublings of the same intermediate: 2^200 paths, one visit per node
+        def f(x):
+            y = x[0]
+            for _ in range(200):
+                y = (y + y) * 0.5
+            return [y * x[1]]
+        assert np.allclose(RAD(f).get_jacobian([1.5, 2.0]), [2.0, 1.5])
+
+    def test_node_layout(self):
+        from src.reversead import ReverseNode
+        x, y = ReverseNode(2), ReverseNode(3)
+        z = x * y
+        assert not hasattr(z, '__dict__')
+        assert z.child0 is x and z.child1 is y
+        assert z.child_pointers == [x, y]
+        assert z.gradient == [3, 2]
+        w = -x
+        assert w.child1 is None and w.gradient == [-1]
+
+    def test_vector_adjoints(self):
+        def shared(x):
+            y = sin(x[0] * x[1]) + x[2]
+            return [y * k for k in range(1, 6)] + [x[2], 4, y]
+
+        vals = [0.3, 0.7, 1.1]
+        expected = AD(shared).get_jacobian(vals)
+        for mode in ('graph', 'tape'):
+            for block_size in (None, 1, 3):
+                assert np.allclose(RAD(shared, mode=mode).get_jacobian(vals, block_size=block_size), expected)
+
+    def test_vjp(self):
+        vals, u = [2, 2, 3], [0.5, 3, -2]
+        jacob = AD(self.fn).get_jacobian(vals)
+        for mode in ('graph', 'tape'):
+            values, product = RAD(self.fn, mode=mode).vjp(vals, u)
+            assert np.allclose(values, AD(self.fn).get_val(vals))
+            assert np.allclose(product, np.array(u) @ jacob)
+
+    def test_hessian(self):
+        def f(x):
+            acc = x[0] ** x[1] + x[1] / x[0] - x[0] ** 3 + log(x[1], 2)
+            for g in (sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log):
+                acc = acc + g(x[0] * x[1] * 0.5)
+            return [acc]
+
+        def gradient(x):
+            return RAD(f).get_jacobian(list(x))
+
+        vals, h = np.array([0.4, 0.7]), 1e-6
+        finite_diff = np.array([(gradient(vals + h * e) - gradient(vals - h * e)) / (2 * h) for e in np.eye(2)])
+        hessian = RAD(f).hessian(list(vals))
+        assert np.allclose(hessian, finite_diff, atol=1e-5)
+        assert np.allclose(hessian, hessian.T)
+        assert np.allclose(RAD(f).hvp(list(vals), [1, -2]), hessian @ [1, -2])
+
+    def test_batch(self):
+        from concurrent.futures import ProcessPoolExecutor
+        X = np.array([[2, 2, 3], [1, -1, 0.5], [0.3, 4, 2], [1, 1, 1], [2, 0.5, 1]])
+        vals_f, jacob_f = AD(self.fn).forward_mode_batch(X)
+        for mode in ('graph', 'tape'):
+            vals, jacob = RAD(self.fn, mode=mode).reverse_mode_batch(X)
+            assert np.allclose(vals, vals_f)
+            assert np.allclose(jacob, jacob_f)
+        with ProcessPoolExecutor(2) as executor:
+            for shared_memory in (True, False):
+                vals, jacob = RAD(self.fn).reverse_mode_batch(X, executor=executor, row_chunk_size=2, shared_memory=shared_memory)
+                assert np.allclose(vals, vals_f)
+                assert np.allclose(jacob, jacob_f)
+
+    def test_graph_release(self):
+        import gc
+        from src.reversead import ReverseNode
+        jacob = AD(self.fn).get_jacobian([2, 2, 3])
+        for mode in ('graph', 'tape', 'tensor'):
+            rad = RAD(self.fn, mode=mode)
+            assert np.allclose(rad.get_jacobian([2, 2, 3]), jacob)
+            gc.collect()
+            assert rad.graph is None and all(base is None for base in rad.bases)
+
+        rad = RAD(self.fn)
+        rad.get_jacobian([2, 2, 3], retain_graph=True)
+        assert rad.graph[0].child0 is not None
+        assert np.allclose(rad._get_base_partials_nd(rad.graph, rad.bases), jacob)
+
+        x, y = ReverseNode(2), ReverseNode(3)
+        z = sin(x * y) + x
+        assert RAD(self.fn)._get_base_partials_1d(z, [x, y], retain_graph=False) == [3 * np.cos(6) + 1, 2 * np.cos(6)]
+        assert z.child0 is None and z.child1 is None and x.adjoint is None
@@ -0,0 +1,72 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.compiler import CompiledFunction, interpret, trace
+from src.serialize import load_trace, read_header, FORMAT_VERSION
+from src.elementary_functions import sin, cos, exp, log
+import numpy as np
+import pytest
+
+
+def piecewise(x):
+    y = x[0] * x[1]
+    if y > 1:
+        return [sin(y), 1, log(x[1], 2)]
+    return [x[0] ** 2 - exp(x[1]), 1, x[1] / x[0]]
+
+
+def other(x):
+    return [cos(x[0]) * x[1], 1, x[0]]
+
+
+class Test_Serialize:
+    '''
+    Test class for trace files and interpreted replay
+    Functional with pytest
+    '''
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'piecewise.trace')
+        for mode, reference in (('reverse', RAD(piecewise)), ('forward', AD(piecewise))):
+            saver = CompiledFunction(piecewise, mode=mode)
+            saver.save(path, [2.0, 3.0])
+            # saving installs nothing, so it records no report either
+            assert saver.reports == saver.programs == {}
+            assert read_header(path)[:5] == (FORMAT_VERSION, 2, 5, 3, 1)
+            recording, n_inputs, outputs = load_trace(path, piecewise)
+            assert isinstance(recording.ops, np.memmap) and outputs[1] == ('const', 1.0)
+            for interpreted in (True, False):
+                loaded = CompiledFunction(piecewise, mode=mode).load(path, interpreted=interpreted)
+                for vals in ([2.0, 3.0], [1.5, 0.9], [0.5, 0.2]):
+                    values, jacob = loaded(vals)
+                    expected = reference.get_val(vals) if mode == 'forward' else reference.get_vals(vals)
+                    assert np.allclose(values, expected)
+                    assert np.allclose(jacob, reference.get_jacobian(vals))
+                # only [0.5, 0.2] takes the other branch
+                assert loaded.retraces == 1 and len(loaded.programs[2]) == 2
+                # the loaded specialization has no report, the retraced one does
+                assert loaded.reports[2][1] is None and loaded.reports[2][0]['after'] > 0
+
+    def test_interpret_matches_lower(self):
+        def fn(x):
+            return [f(x[0] * x[1]) for f in (sin, cos, exp)] + [x[0] ** x[1], 2 / x[1], 3 - x[0], -x[0], x[1] ** 3, 4]
+        for mode in ('reverse', 'forward'):
+            program = interpret(*trace(fn, [0.3, 0.7]), mode=mode)
+            lowered = CompiledFunction(fn, mode=mode, optimize=False)
+            for vals in ([0.3, 0.7], [1.1, 0.2]):
+                values, jacob = program(vals)
+                expected_values, expected_jacob = lowered(vals)
+                assert np.allclose(values, expected_values) and np.allclose(jacob.reshape(expected_jacob.shape), expected_jacob)
+
+    def test_rejects_mismatch(self, tmp_path):
+        path = str(tmp_path / 'piecewise.trace')
+        CompiledFunction(piecewise).save(path, [2.0, 3.0])
+        with pytest.raises(ValueError, match='different function'):
+            CompiledFunction(other).load(path)
+        with open(path, 'r+b') as file:
+            file.seek(8)
+            file.write((FORMAT_VERSION + 1).to_bytes(4, 'little'))
+        with pytest.raises(ValueError, match='not supported'):
+            load_trace(path)
+        with open(path, 'wb') as file:
+            file.write(b'not a trace')
+        with pytest.raises(ValueError, match='not a trace file'):
+            load_trace(path)
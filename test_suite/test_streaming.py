@@ -0,0 +1,91 @@
+from src.ad import ReverseAutoDiff as RAD
+from src.streaming import streaming_gradient
+from src.elementary_functions import exp
+import numpy as np
+import pytest
+
+
+class Test_Streaming:
+    '''
+    Test class for streaming gradient accumulation
+    Functional with pytest
+    '''
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 2))
+    Y = X @ np.array([1.5, -0.5]) + 0.3
+
+    @staticmethod
+    def loss(p, chunk):
+        X, Y = chunk
+        total = 0
+        for x, y in zip(X, Y):
+            total = total + (p[0] * x[0] + p[1] * x[1] + exp(p[2] * 0.1) - y) ** 2
+        return total
+
+    def chunks(self, size):
+        for start in range(0, len(self.X), size):
+            yield self.X[start:start + size], self.Y[start:start + size]
+
+    def test_matches_full_loss(self):
+        params = [0.2, 0.4, -0.1]
+        full = RAD(lambda p: [self.loss(p, (self.X, self.Y))])
+        expected = np.reshape(full.get_jacobian(params), -1)
+        for size, prefetch in ((60, 0), (7, 0), (7, 1), (1, 3)):
+            value, gradient, n_chunks = streaming_gradient(self.loss, params, self.chunks(size), prefetch=prefetch)
+            assert n_chunks == -(-len(self.X) // size)
+            assert np.isclose(value, full.get_vals(params)[0])
+            assert np.allclose(gradient, expected)
+
+    def test_modes(self):
+        def tensor_loss(p, chunk):
+            X, Y = chunk
+            return ((X @ p[:2] + np.exp(p[2] * 0.1) - Y) ** 2).sum()
+        params = [0.2, 0.4, -0.1]
+        expected = streaming_gradient(self.loss, params, self.chunks(60))
+        for mode, loss in (('tape', self.loss), ('tensor', tensor_loss)):
+            value, gradient, _ = streaming_gradient(loss, params, self.chunks(9), mode=mode, prefetch=2)
+            assert np.isclose(value, expected[0]) and np.allclose(gradient, expected[1])
+
+    def test_empty_and_errors(self):
+        value, gradient, n_chunks = streaming_gradient(self.loss, [1.0, 2.0, 3.0], iter(()), prefetch=1)
+        assert value == 0.0 and np.all(gradient == 0) and n_chunks == 0
+
+        def broken():
+            yield self.X[:5], self.Y[:5]
+            raise RuntimeError('bad chunk')
+        for prefetch in (0, 2):
+            with pytest.raises(RuntimeError, match='bad chunk'):
+                streaming_gradient(self.loss, [0.0, 0.0, 0.0], broken(), prefetch=prefetch)
+
+    def test_early_stop(self):
+        import threading
+        import time
+        from src.streaming import _prefetched
+        # the producer is left waiting to put the end marker into a full queue when the consumer stops
+        before = threading.active_count()
+        chunks = _prefetched(iter([1, 2]), 1)
+        assert next(chunks) == 1
+        time.sleep(0.2)
+        chunks.close()
+        deadline = time.monotonic() + 5
+        while threading.active_count() > before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert threading.active_count() == before
+
+    def test_failing_loss(self):
+        import threading
+        import time
+        # a loss that raises partway through stops the prefetch thread while the error is still held
+        before = threading.active_count()
+
+        def loss(p, chunk):
+            if chunk[0][0, 0] == self.X[14, 0]:
+                raise RuntimeError('bad loss')
+            return self.loss(p, chunk)
+        with pytest.raises(RuntimeError, match='bad loss') as error:
+            streaming_gradient(loss, [0.0, 0.0, 0.0], self.chunks(7), prefetch=1)
+        deadline = time.monotonic() + 5
+        while threading.active_count() > before and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert threading.active_count() == before and error.value is not None
@@ -0,0 +1,38 @@
+from src.ad import ReverseAutoDiff as RAD
+from src.elementary_functions import sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log
+from src.tape import Tape, TapeNode, MUL, SIN
+import numpy as np
+
+
+class Test_Tape:
+    '''
+    Test class for the array-backed tape engine
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def fn(x):
+        fns = [sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log]
+        return [f(x[0] * x[1]) for f in fns] + [x[0] ** x[1], x[0] / x[1], 2 / x[1], 3 - x[0], -x[0], x[0] ** 3,
+                                               x[1] - 1, log(x[1], 2), 1]
+
+    def test_record(self):
+        tape = Tape(capacity=2)
+        x = tape.variable(2.0)
+        y = tape.variable(3.0)
+        z = sin(x * y)
+        assert isinstance(z, TapeNode)
+        assert len(tape) == 4
+        assert list(tape.ops[2:4]) == [MUL, SIN]
+        assert list(tape.parents[2]) == [0, 1]
+        assert z.val == np.sin(6)
+        assert np.allclose(tape.backward(z.index)[:2], [3 * np.cos(6), 2 * np.cos(6)])
+
+    def test_matches_graph(self):
+        vals = [0.3, 0.7]
+        graph, recorded = RAD(self.fn), RAD(self.fn, mode='tape')
+        assert np.allclose(recorded.get_vals(vals), graph.get_vals(vals))
+        assert np.allclose(recorded.get_jacobian(vals), graph.get_jacobian(vals))
+
+    def test_single_output(self):
+        assert np.array_equal(RAD(lambda x: [x[0] * x[1] + x[0]], mode='tape').get_jacobian([3, 4]), [5, 3])
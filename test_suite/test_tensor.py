@@ -0,0 +1,74 @@
+from src.ad import AutoDiff as AD, ReverseAutoDiff as RAD
+from src.elementary_functions import sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log
+from src.tensor import TensorNode, grad, dot, stack
+import numpy as np
+
+
+class Test_Tensor:
+    '''
+    Test class for array-valued reverse mode nodes
+    Functional with pytest
+    '''
+
+    @staticmethod
+    def finite_diff(f, x, h=1e-6):
+        g = np.zeros_like(x)
+        for i in np.ndindex(x.shape):
+            e = np.zeros_like(x)
+            e[i] = h
+            g[i] = (f(x + e) - f(x - e)) / (2 * h)
+        return g
+
+    def check(self, f, *arrays):
+        nodes = [TensorNode(a) for a in arrays]
+        out = f(*nodes)
+        for k, g in enumerate(grad(out, nodes)):
+            def f_k(a):
+                return f(*(TensorNode(b) for b in arrays[:k] + (a,) + arrays[k + 1:])).val
+            assert np.allclose(g, self.finite_diff(f_k, arrays[k]), atol=1e-6)
+
+    def test_dense_layer(self):
+        rng = np.random.default_rng(0)
+        W, x, b = rng.normal(size=(4, 3)), rng.normal(size=3), rng.normal(size=4)
+        self.check(lambda W, x, b: np.sum(np.tanh(W @ x + b) ** 2) + np.mean(np.exp(W.T[1:])), W, x, b)
+        self.check(lambda W, x, b: (dot(x, W.T) * b).sum() + (x @ x) / (1 + x[[0, 0, 2]].sum() ** 2), W, x, b)
+
+    def test_broadcasting(self):
+        rng = np.random.default_rng(1)
+        A, v, c = rng.normal(size=(2, 3, 4)), rng.normal(size=4), rng.normal(size=(1, 3))
+        self.check(lambda A, v, c: (((A @ v) * c + 1 / (2 + A.sum(axis=2))) ** 2).sum() + (2 ** (v * 0.1)).sum()
+                   + ((3 - v) / (v * v + 1)).sum() + np.transpose(A, (2, 0, 1))[1].reshape(-1).sum() * c.sum(), A, v, c)
+
+    def test_elementwise(self):
+        x = np.array([0.2, 0.4, 0.6])
+        for f in (sin, cos, tan, exp, arcsin, arccos, arctan, sinh, cosh, tanh, logistic, sqrt, log):
+            self.check(lambda x: f(x).sum(), x)
+        self.check(lambda x: (log(x, 2) + x ** x).sum(), x)
+
+    def test_stack(self):
+        x = TensorNode([1.0, 2.0, 3.0])
+        out = stack([x[0] * x[1], 3.0, sin(x[2])])
+        assert np.allclose(out.val, [2, 3, np.sin(3)])
+        assert np.allclose(grad(out, [x], seed=[1, 1, 1])[0], [2, 1, np.cos(3)])
+
+    def test_tensor_mode(self):
+        rng = np.random.default_rng(2)
+        W, b = rng.normal(size=(5, 3)), rng.normal(size=5)
+        vals = [0.1, 0.2, 0.3]
+
+        def layer(x):
+            return np.tanh(W @ x + b)
+
+        def scalar_layer(x):
+            return [tanh(sum(W[i, j] * x[j] for j in range(3)) + b[i]) for i in range(5)]
+
+        rad = RAD(layer, mode='tensor')
+        assert np.allclose(rad.get_vals(vals), layer(np.array(vals)))
+        assert np.allclose(rad.get_jacobian(vals), AD(scalar_layer).get_jacobian(vals))
+        u = np.arange(5.0)
+        assert np.allclose(rad.vjp(vals, u)[1], u @ AD(scalar_layer).get_jacobian(vals))
+        assert np.allclose(RAD(lambda x: [(x * x).sum()], mode='tensor').get_jacobian(vals), [0.2, 0.4, 0.6])
+
+        def fn(x):
+            return [x[0] * x[1] + 2 * sin(x[0]) ** 2 + 2, 1, x[2] * x[1] + log(x[0])]
+        assert np.allclose(RAD(fn, mode='tensor').get_jacobian([2, 2, 3]), AD(fn).get_jacobian([2, 2, 3]))